@@ -0,0 +1,158 @@
+"""
+Micro-benchmark of directory rendering: per-item calls vs. the batched builder.
+
+Builds a listing of N Webshare results (500 by default) twice with the stub
+xbmc* modules: the way list_search_results used to (ListItem with setInfo,
+one addDirectoryItem per entry) and with resources.lib.directory.Directory
+(offscreen items, InfoTagVideo setters, one addDirectoryItems call).
+
+The stubs cost next to nothing, so besides the plugin-side time the script
+counts the calls crossing into Kodi. Calls on items that are not offscreen
+and every addDirectoryItem(s) call take Kodi's GUI lock; --call-us and
+--lock-us add a simulated cost per plain and per locking call to estimate
+their weight on a real box.
+
+Usage:
+    python benchmarks/directory_bench.py [--items 500] [--repeat 20] [--call-us 0] [--lock-us 0]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [os.path.join(HERE, "stubs"), ROOT]
+
+import xbmcgui  # noqa: E402
+import xbmcplugin  # noqa: E402
+
+from resources.lib.directory import Directory, format_size  # noqa: E402
+from resources.lib.webshare import WebshareFile  # noqa: E402
+
+PLUGIN_URL = "plugin://plugin.video.kodisimplestream/"
+
+
+class CallMeter:
+    """Counts (and optionally slows down) calls into the stub Kodi modules"""
+
+    def __init__(self, call_cost=0.0, lock_cost=0.0):
+        self.call_cost = call_cost
+        self.lock_cost = lock_cost
+        self.calls = 0
+        self.locked = 0
+
+    def charge(self, locking):
+        self.calls += 1
+        cost = self.call_cost
+        if locking:
+            self.locked += 1
+            cost += self.lock_cost
+        if cost:
+            end = time.perf_counter() + cost
+            while time.perf_counter() < end:
+                pass
+
+    def install(self):
+        meter = self
+
+        def wrap_method(cls, name):
+            original = getattr(cls, name)
+
+            def method(item, *args, **kwargs):
+                meter.charge(locking=not getattr(item, "offscreen", kwargs.get("offscreen", False)))
+                return original(item, *args, **kwargs)
+            setattr(cls, name, method)
+
+        for name in ("__init__", "setLabel", "setLabel2", "setInfo", "setArt", "setProperty", "getVideoInfoTag"):
+            wrap_method(xbmcgui.ListItem, name)
+        tag_getattr = xbmcgui.InfoTagVideo.__getattr__
+
+        def tag_setter(tag, name):
+            setter = tag_getattr(tag, name)
+
+            def call(*args):
+                meter.charge(locking=False)
+                return setter(*args)
+            return call
+        xbmcgui.InfoTagVideo.__getattr__ = tag_setter
+
+        for name in ("addDirectoryItem", "addDirectoryItems", "endOfDirectory", "addSortMethod", "setContent"):
+            original = getattr(xbmcplugin, name)
+
+            def function(*args, _original=original, _name=name, **kwargs):
+                meter.charge(locking=_name.startswith("addDirectoryItem"))
+                return _original(*args, **kwargs)
+            setattr(xbmcplugin, name, function)
+
+
+def make_files(count):
+    return [
+        WebshareFile(f"id{i:05d}", name=f"Akta X S01E{i % 24 + 1:02d} 1080p CZ dabing {i}.mkv",
+                     size=(700 + i) * 1024 * 1024, img=f"https://img.example/{i}.jpg")
+        for i in range(count)
+    ]
+
+
+def per_item(files):
+    for file in files:
+        item = xbmcgui.ListItem(label=file.name)
+        item.setInfo("video", {"title": file.name, "size": file.size})
+        item.setArt({"poster": file.img, "fanart": file.img})
+        item.setProperty("IsPlayable", "true")
+        xbmcplugin.addDirectoryItem(1, f"{PLUGIN_URL}?action=play&ident={file.ident}", item, isFolder=False)
+    xbmcplugin.addSortMethod(1, xbmcplugin.SORT_METHOD_NONE)
+    xbmcplugin.setContent(1, "videos")
+    xbmcplugin.endOfDirectory(1)
+
+
+def batched(files):
+    directory = Directory(1, content="videos", cache_to_disc=False, sort_methods=(xbmcplugin.SORT_METHOD_NONE,))
+    for file in files:
+        directory.add(
+            f"{PLUGIN_URL}?action=play&ident={file.ident}",
+            file.name,
+            is_folder=False,
+            label2=format_size(file.size),
+            info={"title": file.name, "mediatype": "video"},
+            art={"poster": file.img, "fanart": file.img},
+            properties={"IsPlayable": "true"},
+        )
+    directory.end()
+
+
+def measure(render, files, meter, repeat):
+    times = []
+    for _ in range(repeat):
+        xbmcplugin.reset()
+        meter.calls = meter.locked = 0
+        start = time.perf_counter()
+        render(files)
+        times.append(time.perf_counter() - start)
+    assert len(xbmcplugin.directory) == len(files)
+    return statistics.median(times) * 1000, meter.calls, meter.locked
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=500, help="number of listed files")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per variant, the median is reported")
+    parser.add_argument("--call-us", type=float, default=0.0, help="simulated cost of every Kodi API call")
+    parser.add_argument("--lock-us", type=float, default=0.0, help="extra simulated cost of calls taking the GUI lock")
+    args = parser.parse_args(argv)
+
+    meter = CallMeter(args.call_us / 1e6, args.lock_us / 1e6)
+    meter.install()
+    files = make_files(args.items)
+
+    print(f"{args.items} items, median of {args.repeat} runs")
+    print(f"{'variant':<10} {'ms':>9} {'API calls':>10} {'GUI-locked':>11}")
+    for name, render in (("per-item", per_item), ("batched", batched)):
+        ms, calls, locked = measure(render, files, meter, args.repeat)
+        print(f"{name:<10} {ms:>9.2f} {calls:>10} {locked:>11}")
+
+
+if __name__ == "__main__":
+    main()
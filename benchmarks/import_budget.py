@@ -0,0 +1,165 @@
+"""
+Import-time budget check for plugin cold starts.
+
+Kodi starts a fresh interpreter for every plugin URL, so whatever
+kodisimplestream.py imports is paid on each click. This script runs every
+route below in a new `python -X importtime` process against the local
+stand-in server, sums the import time spent once the plugin starts, and
+fails when a route exceeds its budget or imports a module it must not need.
+
+Usage:
+    python benchmarks/import_budget.py [--scale 1.0]
+
+--scale multiplies all time budgets (e.g. 3 on a slow box); the module
+checks are always enforced.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+PLUGIN_SCRIPT = os.path.join(ROOT, "kodisimplestream.py")
+MARKER = "import-budget: plugin start"
+
+# (name, paramstring, keyboard input, budget in ms, modules the route must not import)
+ROUTES = [
+    ("root", "", None, 15, {"requests", "bs4", "sqlite3"}),
+    ("play", "action=play&ident=bench0001x", None, 120, {"bs4"}),
+    ("list_search_results", "action=list_search_results&query=%5B%27pelisky%27%5D", None, 150, {"bs4"}),
+    ("search_csfd_movie", "action=search_csfd_movie", "pelisky", 200, set()),
+    ("select_csfd", "action=select_csfd&csfd_id=10135-pelisky&search_type=movie", None, 200, set()),
+]
+
+HEAVY_MODULES = ("requests", "urllib3", "bs4", "sqlite3", "lxml")
+
+
+def child(server_url, profile, paramstring, keyboard):
+    """Runs one route in this (fresh) interpreter"""
+    sys.path[:0] = [os.path.join(HERE, "stubs"), ROOT]
+    import xbmc
+    import xbmcaddon
+
+    xbmcaddon.settings.update({"username": "bench", "password": "bench"})
+    xbmcaddon.info.update({"profile": profile, "path": ROOT})
+    if keyboard:
+        xbmc.keyboard_input.append(keyboard)
+
+    _redirect_transport(server_url)
+
+    with open(PLUGIN_SCRIPT, encoding="utf-8") as f:
+        code = compile(f.read(), PLUGIN_SCRIPT, "exec")
+    sys.argv = ["plugin://plugin.video.kodisimplestream/", "1", "?" + paramstring]
+    print(MARKER, file=sys.stderr, flush=True)
+    exec(code, {"__name__": "__main__", "__file__": PLUGIN_SCRIPT})
+    print(json.dumps([m for m in HEAVY_MODULES if m in sys.modules]))
+
+
+def _redirect_transport(server_url):
+    """
+    Sends traffic to the stand-in server as soon as the plugin imports
+    resources.lib.transport, without importing requests ourselves.
+    """
+    import importlib.abc
+    import importlib.machinery
+
+    class Finder(importlib.abc.MetaPathFinder):
+        def find_spec(self, name, path, target=None):
+            if name != "resources.lib.transport":
+                return None
+            sys.meta_path.remove(self)
+            spec = importlib.machinery.PathFinder.find_spec(name, path)
+            loader_exec = spec.loader.exec_module
+
+            def exec_module(module):
+                loader_exec(module)
+
+                class StandInSession(module.Session):
+                    def request(self, method, url, **kwargs):
+                        for host in ("https://webshare.cz", "https://www.csfd.cz",
+                                     "https://image.pmgstatic.com", "https://img.webshare.cz"):
+                            if url.startswith(host):
+                                url = server_url + url[len(host):]
+                        return super().request(method, url, **kwargs)
+
+                module.set_session(StandInSession())
+
+            spec.loader.exec_module = exec_module
+            return spec
+
+    sys.meta_path.insert(0, Finder())
+
+
+def plugin_import_ms(stderr):
+    """Sums cumulative time of top-level imports logged after the plugin started"""
+    total_us = 0
+    started = False
+    for line in stderr.splitlines():
+        if line.startswith(MARKER):
+            started = True
+            continue
+        if not started or not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2]
+        # Nested imports are indented, top-level ones have a single leading space
+        if name.startswith(" ") and not name.startswith("  "):
+            total_us += int(parts[1])
+    return total_us / 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for all time budgets")
+    parser.add_argument("--child", nargs=4, metavar=("SERVER", "PROFILE", "PARAMS", "KEYBOARD"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        server_url, profile, paramstring, keyboard = args.child
+        child(server_url, profile, paramstring, keyboard)
+        return 0
+
+    sys.path.insert(0, HERE)
+    from server import StandInServer
+
+    server = StandInServer(latency=0, jitter=0).start()
+    failures = 0
+    print(f"{'route':<22} {'import ms':>10} {'budget':>8}  heavy modules")
+    try:
+        for name, paramstring, keyboard, budget, forbidden in ROUTES:
+            profile = tempfile.mkdtemp(prefix="kodisimplestream-imports-")
+            proc = subprocess.run(
+                [sys.executable, "-X", "importtime", os.path.abspath(__file__),
+                 "--child", server.url, profile, paramstring, keyboard or ""],
+                capture_output=True, text=True, cwd=ROOT,
+            )
+            shutil.rmtree(profile, ignore_errors=True)
+            if proc.returncode != 0:
+                print(f"{name:<22} FAILED\n{proc.stderr[-2000:]}")
+                failures += 1
+                continue
+            loaded = set(json.loads(proc.stdout.strip().splitlines()[-1]))
+            spent = plugin_import_ms(proc.stderr)
+            limit = budget * args.scale
+            problems = []
+            if spent > limit:
+                problems.append("over budget")
+            if loaded & forbidden:
+                problems.append("must not import " + ", ".join(sorted(loaded & forbidden)))
+            failures += bool(problems)
+            print(f"{name:<22} {spent:>10.1f} {limit:>8.0f}  {', '.join(sorted(loaded)) or '-'}"
+                  + (f"  <-- {'; '.join(problems)}" if problems else ""))
+    finally:
+        server.stop()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Parity and speed check of the CSFD HTML extraction backends.
+
+Runs every CSFD page parser on the saved fixtures in benchmarks/fixtures/csfd
+once with the reference backend ("full", the complete html.parser tree) and
+once with the targeted one ("fast", see resources/lib/htmlparse.py), fails
+when their results differ and reports how much faster the fast backend is.
+
+The fast backend uses lxml when it is installed. Kodi only provides it when
+an addon depends on script.module.lxml, which this one does not, so the
+html.parser numbers are the ones users get.
+
+Usage:
+    python benchmarks/parser_parity.py [--repeat 20]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+FIXTURES = os.path.join(HERE, "fixtures", "csfd")
+sys.path.insert(0, ROOT)
+
+from resources.lib.csfd import CSFD  # noqa: E402
+from resources.lib.htmlparse import FAST_FEATURES  # noqa: E402
+
+# (name, fixture, parse(csfd, content))
+CASES = [
+    ("detail", "film_movie.html", lambda csfd, content: csfd._parse_detail(content)),
+    ("overview", "film_series.html", lambda csfd, content: csfd._parse_overview(content)),
+    ("seasons", "film_series.html", lambda csfd, content: csfd._parse_seasons(content)),
+    ("episodes", "season.html", lambda csfd, content: csfd._parse_episodes(content)),
+    ("search movie", "search.html", lambda csfd, content: csfd._parse_search(content, "movie")),
+    ("search series", "search.html", lambda csfd, content: csfd._parse_search(content, "series")),
+]
+
+
+def measure(parse, csfd, content, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parse(csfd, content)
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="runs per parser and backend, the median is reported")
+    args = parser.parse_args(argv)
+
+    full = CSFD(parser="full", session=object())
+    fast = CSFD(parser="fast", session=object())
+
+    print(f"fast backend on {FAST_FEATURES}, median of {args.repeat} runs")
+    print(f"{'parser':<14} {'full ms':>8} {'fast ms':>8} {'speedup':>8}  result")
+    mismatches = 0
+    for name, fixture, parse in CASES:
+        with open(os.path.join(FIXTURES, fixture), "rb") as f:
+            content = f.read()
+        expected, full_ms = measure(parse, full, content, args.repeat)
+        actual, fast_ms = measure(parse, fast, content, args.repeat)
+        same = actual == expected
+        mismatches += not same
+        print(f"{name:<14} {full_ms:>8.2f} {fast_ms:>8.2f} {full_ms / fast_ms:>7.1f}x  {'same' if same else 'DIFFERENT'}")
+        if not same:
+            print(f"  full: {expected!r}\n  fast: {actual!r}")
+
+    if mismatches:
+        print(f"\n{mismatches} parser(s) differ between the backends")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
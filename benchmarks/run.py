@@ -0,0 +1,229 @@
+"""
+Offline end-to-end benchmark of the plugin routes.
+
+Runs scripted navigation scenarios against the local stand-in server
+(benchmarks/server.py) with stub xbmc* modules (benchmarks/stubs) and
+reports, per route, the time until the directory is shown or playback is
+resolved, the total time including background work, and the number of
+HTTP calls and bytes transferred.
+
+The series scenario ends with play_next, the episode the background service
+(service.py) prepares while the previous one plays and offers at its end.
+The preparation itself happens during playback and is not measured.
+
+Every route is executed the way Kodi does it: the plugin script is run
+afresh as __main__ with a new HTTP session. The first pass starts with an
+empty addon profile (cold), the following passes reuse it (warm).
+
+Usage:
+    python benchmarks/run.py [--latency 0.05] [--jitter 0.02] [--runs 2] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [os.path.join(HERE, "stubs"), HERE, ROOT]
+
+import xbmc  # noqa: E402
+import xbmcaddon  # noqa: E402
+import xbmcplugin  # noqa: E402
+
+from resources.lib import transport  # noqa: E402
+from server import StandInServer  # noqa: E402
+
+PLUGIN_URL = "plugin://plugin.video.kodisimplestream/"
+PLUGIN_SCRIPT = os.path.join(ROOT, "kodisimplestream.py")
+with open(PLUGIN_SCRIPT, encoding="utf-8") as _f:
+    PLUGIN_CODE = compile(_f.read(), PLUGIN_SCRIPT, "exec")
+
+SETTINGS = {
+    "username": "bench",
+    "password": "bench",
+    "csfd_workers": "4",
+    "cache_size": "32",
+    "cache_stale": "false",
+    "local_search": "true",
+    "csfd_shallow": "true",
+}
+
+
+class RecordingSession(transport.Session):
+    """Session sending Webshare and CSFD requests to the stand-in server and counting them"""
+
+    HOSTS = ("https://webshare.cz", "https://www.csfd.cz", "https://image.pmgstatic.com", "https://img.webshare.cz")
+
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url
+        self.calls = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        for host in self.HOSTS:
+            if url.startswith(host):
+                url = self.base_url + url[len(host):]
+                break
+        response = super().request(method, url, **kwargs)
+        with self._lock:
+            self.calls += 1
+            self.bytes += int(response.headers.get("Content-Length") or 0)
+        return response
+
+
+# ----------------------------------------------------------------------------
+# Scenario steps – each picks the next paramstring from the previous listing
+# ----------------------------------------------------------------------------
+
+def _params(url):
+    return urlsplit(url).query
+
+
+def first_folder(directory):
+    for url, _, is_folder in directory:
+        # Skip "Next page" and the "Search CSFD online" item above local hits
+        if is_folder and "offset=" not in url and "action=search_csfd_online" not in url:
+            return _params(url)
+    raise RuntimeError("Listing has no folder to open")
+
+
+def first_playable(directory):
+    for url, item, is_folder in directory:
+        if not is_folder and item.getProperty("IsPlayable") == "true":
+            return _params(url)
+    raise RuntimeError("Listing has no playable item")
+
+
+def prepared_next(server):
+    """Lets the service prepare the episode after the one just played and accept its offer"""
+    from service import WarmupService
+
+    session = RecordingSession(server.url)
+    transport.set_session(session)
+    service = WarmupService()
+    service.player.onAVStarted()
+    prepared = service.prepare_next(service.player.playing)
+    session.close()
+    if prepared is None:
+        raise RuntimeError("The service prepared no next episode")
+    service.offer_next(prepared)
+    return _params(xbmc.played[-1])
+
+
+def fixed(paramstring, keyboard=None):
+    def step(directory):
+        if keyboard is not None:
+            xbmc.keyboard_input.append(keyboard)
+        return paramstring
+    return step
+
+
+SCENARIOS = {
+    "webshare": [
+        ("search_webshare", fixed("action=search_webshare", keyboard="pelisky")),
+        ("play", first_playable),
+    ],
+    "movie": [
+        ("search_csfd_movie", fixed("action=search_csfd_movie", keyboard="pelisky")),
+        ("select_csfd", first_folder),
+        ("play", first_playable),
+    ],
+    "series": [
+        ("search_csfd_series", fixed("action=search_csfd_series", keyboard="akta x")),
+        ("select_csfd", first_folder),
+        ("list_episodes", first_folder),
+        ("list_search_results", first_folder),
+        ("play", first_playable),
+        ("play_next", prepared_next),
+    ],
+}
+
+
+def invoke(server, paramstring):
+    """Runs the plugin once for {paramstring} like Kodi would and measures it"""
+    xbmcplugin.reset()
+    session = RecordingSession(server.url)
+    transport.set_session(session)
+    sys.argv = [PLUGIN_URL, "1", "?" + paramstring]
+
+    start = time.perf_counter()
+    exec(PLUGIN_CODE, {"__name__": "__main__", "__file__": PLUGIN_SCRIPT})
+    total = time.perf_counter() - start
+    shown = (xbmcplugin.ended[0]["time"] - start) if xbmcplugin.ended else total
+
+    session.close()
+    return {
+        "shown_ms": round(shown * 1000, 1),
+        "total_ms": round(total * 1000, 1),
+        "calls": session.calls,
+        "bytes": session.bytes,
+        "items": len(xbmcplugin.directory),
+    }
+
+
+def run_scenario(server, name):
+    results = []
+    directory = []
+    for label, step in SCENARIOS[name]:
+        paramstring = step(server) if step is prepared_next else step(directory)
+        result = invoke(server, paramstring)
+        result.update({"scenario": name, "route": label})
+        results.append(result)
+        directory = list(xbmcplugin.directory)
+    return results
+
+
+def print_table(title, rows):
+    print(f"\n{title}")
+    print(f"{'scenario':<10} {'route':<22} {'shown ms':>9} {'total ms':>9} {'calls':>6} {'KiB':>8} {'items':>6}")
+    for row in rows:
+        print(f"{row['scenario']:<10} {row['route']:<22} {row['shown_ms']:>9.1f} {row['total_ms']:>9.1f} "
+              f"{row['calls']:>6} {row['bytes'] / 1024:>8.1f} {row['items']:>6}")
+    print(f"{'total':<33} {sum(r['shown_ms'] for r in rows):>9.1f} {sum(r['total_ms'] for r in rows):>9.1f} "
+          f"{sum(r['calls'] for r in rows):>6} {sum(r['bytes'] for r in rows) / 1024:>8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="mean server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="latency jitter in seconds")
+    parser.add_argument("--runs", type=int, default=2, help="number of passes (the first one is cold)")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="scenario to run (default: all)")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    profile = tempfile.mkdtemp(prefix="kodisimplestream-bench-")
+    xbmcaddon.settings.update(SETTINGS)
+    xbmcaddon.info.update({"profile": profile, "path": ROOT})
+
+    server = StandInServer(latency=args.latency, jitter=args.jitter).start()
+    report = []
+    try:
+        for run in range(max(1, args.runs)):
+            rows = []
+            for name in args.scenario or list(SCENARIOS):
+                rows.extend(run_scenario(server, name))
+            title = "cold (empty profile)" if run == 0 else f"warm pass {run}"
+            print_table(title, rows)
+            report.append({"pass": title, "routes": rows})
+    finally:
+        server.stop()
+        transport.set_session(None)
+        shutil.rmtree(profile, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"latency": args.latency, "jitter": args.jitter, "passes": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
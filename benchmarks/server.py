@@ -0,0 +1,132 @@
+"""
+Local stand-in for webshare.cz and csfd.cz.
+
+Replays the fixtures in benchmarks/fixtures over HTTP with a configurable
+latency and jitter per request, so plugin routes can be timed offline.
+"""
+
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+WEBSHARE_ROUTES = {
+    "/api/salt/": "salt.xml",
+    "/api/login/": "login.xml",
+    "/api/user_data/": "user_data.xml",
+    "/api/file_link/": "file_link.xml",
+}
+
+_SEASON_RE = re.compile(r"^/film/[^/]+/[^/]+/prehled/?$")
+_FILM_RE = re.compile(r"^/film/([^/]+)/prehled/?$")
+
+
+def _fixture(*parts):
+    with open(os.path.join(FIXTURES, *parts), "rb") as f:
+        return f.read()
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering both Webshare API and CSFD page requests"""
+
+    daemon_threads = True
+
+    def __init__(self, latency=0.05, jitter=0.02, port=0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self._cache = {}
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def fixture(self, *parts):
+        key = parts
+        if key not in self._cache:
+            self._cache[key] = _fixture(*parts)
+        return self._cache[key]
+
+    def delay(self):
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        self.server.delay()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = parse_qs(self.rfile.read(length).decode("utf-8", "replace"))
+        path = re.sub(r"/+", "/", urlsplit(self.path).path)
+
+        if path == "/api/search/":
+            offset = int((form.get("offset") or ["0"])[0])
+            name = "search.xml" if offset == 0 else "search_empty.xml"
+            body = self.server.fixture("webshare", name)
+        elif path in WEBSHARE_ROUTES:
+            body = self.server.fixture("webshare", WEBSHARE_ROUTES[path])
+        else:
+            self._send(404, b"<response><status>FATAL</status></response>", "text/xml")
+            return
+        self._send(200, body, "text/xml; charset=UTF-8")
+
+    def do_GET(self):
+        path = re.sub(r"/+", "/", urlsplit(self.path).path)
+
+        if path.startswith("/hledat"):
+            body = self.server.fixture("csfd", "search.html")
+        elif _SEASON_RE.match(path):
+            body = self.server.fixture("csfd", "season.html")
+        elif _FILM_RE.match(path):
+            full_id = _FILM_RE.match(path).group(1)
+            name = "film_series.html" if full_id.endswith("-serial") else "film_movie.html"
+            body = self.server.fixture("csfd", name)
+        elif path.startswith(("/cache/resized/", "/files/", "/static/previews/")):
+            # Artwork, sized roughly like a JPEG of the requested width
+            width = re.match(r"/cache/resized/w(\d+)", path)
+            size = int(width.group(1)) ** 2 // 4 if width else 12 * 1024 if path.startswith("/static/") else 256 * 1024
+            self._send(200, b"\xff" * size, "image/jpeg")
+            return
+        elif path.startswith("/media/"):
+            body = b"\0" * 1024
+            self._send(200, body, "video/x-matroska")
+            return
+        else:
+            self._send(404, b"Not Found", "text/plain")
+            return
+        self._send(200, body, "text/html; charset=utf-8")
+
+    def do_HEAD(self):
+        self.server.delay()
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
@@ -0,0 +1,48 @@
+"""Minimal stand-in for Kodi's xbmc module used by the benchmark harness."""
+
+LOGDEBUG, LOGINFO, LOGWARNING, LOGERROR, LOGFATAL = 0, 1, 2, 3, 4
+
+# Lines passed to log(), inspected by the harness
+log_lines = []
+# Text returned by the next Keyboard dialogs, consumed in order
+keyboard_input = []
+# Items passed to Player.play(), inspected by the harness
+played = []
+
+
+def log(msg, level=LOGDEBUG):
+    log_lines.append((level, msg))
+
+
+class Keyboard:
+    def __init__(self, default="", heading="", hidden=False):
+        self._text = default
+
+    def doModal(self, autoclose=0):
+        if keyboard_input:
+            self._text = keyboard_input.pop(0)
+
+    def isConfirmed(self):
+        return True
+
+    def getText(self):
+        return self._text
+
+
+class Monitor:
+    def abortRequested(self):
+        return False
+
+    def waitForAbort(self, timeout=0):
+        return False
+
+
+class Player:
+    def __init__(self):
+        pass
+
+    def isPlayingVideo(self):
+        return False
+
+    def play(self, item="", listitem=None, windowed=False, startpos=-1):
+        played.append(item)
@@ -0,0 +1,33 @@
+"""Minimal stand-in for Kodi's xbmcaddon module used by the benchmark harness."""
+
+# Addon settings and info, filled in by the harness before the plugin is imported
+settings = {}
+info = {
+    "id": "plugin.video.kodisimplestream",
+    "name": "kodisimplestream",
+    "profile": "",
+    "path": "",
+}
+
+
+class Addon:
+    def __init__(self, id=None):
+        pass
+
+    def getSetting(self, setting_id):
+        return str(settings.get(setting_id, ""))
+
+    def getSettingBool(self, setting_id):
+        return str(settings.get(setting_id, "")).lower() == "true"
+
+    def getSettingInt(self, setting_id):
+        return int(float(settings.get(setting_id) or 0))
+
+    def setSetting(self, setting_id, value):
+        settings[setting_id] = value
+
+    def getLocalizedString(self, string_id):
+        return f"#{string_id} {{}}"
+
+    def getAddonInfo(self, key):
+        return info.get(key, "")
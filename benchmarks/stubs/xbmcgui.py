@@ -0,0 +1,95 @@
+"""Minimal stand-in for Kodi's xbmcgui module used by the benchmark harness."""
+
+NOTIFICATION_INFO, NOTIFICATION_WARNING, NOTIFICATION_ERROR = "info", "warning", "error"
+
+# Notifications shown by the plugin, inspected by the harness
+notifications = []
+
+
+class InfoTagVideo:
+    def __init__(self):
+        self.tags = {}
+
+    def __getattr__(self, name):
+        if not name.startswith("set"):
+            raise AttributeError(name)
+
+        def setter(*args):
+            self.tags[name[3:].lower()] = args[0] if len(args) == 1 else args
+        return setter
+
+
+class ListItem:
+    def __init__(self, label="", label2="", path="", offscreen=False):
+        self.label = label
+        self.label2 = label2
+        self.path = path
+        self.offscreen = offscreen
+        self.info = {}
+        self.art = {}
+        self.properties = {}
+        self._video_tag = None
+
+    def getLabel(self):
+        return self.label
+
+    def setLabel(self, label):
+        self.label = label
+
+    def setLabel2(self, label):
+        self.label2 = label
+
+    def getPath(self):
+        return self.path
+
+    def setPath(self, path):
+        self.path = path
+
+    def setInfo(self, type, infoLabels):
+        self.info.update(infoLabels)
+
+    def setArt(self, values):
+        self.art.update(values)
+
+    def setProperty(self, key, value):
+        self.properties[key.lower()] = value
+
+    def getProperty(self, key):
+        return self.properties.get(key.lower(), "")
+
+    def setIsFolder(self, is_folder):
+        self.properties["isfolder"] = is_folder
+
+    def getVideoInfoTag(self):
+        if self._video_tag is None:
+            self._video_tag = InfoTagVideo()
+        return self._video_tag
+
+
+class Dialog:
+    def notification(self, heading, message, icon=NOTIFICATION_INFO, time=5000, sound=True):
+        notifications.append((heading, message, icon))
+
+    def ok(self, heading, message):
+        return True
+
+    def yesno(self, heading, message, *args, **kwargs):
+        return True
+
+
+# Window properties by window id, shared between Window instances like in Kodi
+window_properties = {}
+
+
+class Window:
+    def __init__(self, existingWindowId=-1):
+        self.properties = window_properties.setdefault(existingWindowId, {})
+
+    def getProperty(self, key):
+        return self.properties.get(key.lower(), "")
+
+    def setProperty(self, key, value):
+        self.properties[key.lower()] = value
+
+    def clearProperty(self, key):
+        self.properties.pop(key.lower(), None)
@@ -0,0 +1,49 @@
+"""Minimal stand-in for Kodi's xbmcplugin module used by the benchmark harness."""
+
+import time
+
+SORT_METHOD_NONE = 0
+SORT_METHOD_LABEL = 1
+
+# Result of the last plugin invocation, reset by the harness before each route
+directory = []
+resolved = []
+ended = []
+
+
+def reset():
+    del directory[:]
+    del resolved[:]
+    del ended[:]
+
+
+def addDirectoryItem(handle, url, listitem, isFolder=False, totalItems=0):
+    directory.append((url, listitem, isFolder))
+    return True
+
+
+def addDirectoryItems(handle, items, totalItems=0):
+    for url, listitem, is_folder in items:
+        directory.append((url, listitem, is_folder))
+    return True
+
+
+def endOfDirectory(handle, succeeded=True, updateListing=False, cacheToDisc=True):
+    ended.append({"succeeded": succeeded, "cacheToDisc": cacheToDisc, "time": time.perf_counter()})
+
+
+def setResolvedUrl(handle, succeeded, listitem):
+    resolved.append((succeeded, listitem))
+    ended.append({"succeeded": succeeded, "time": time.perf_counter()})
+
+
+def addSortMethod(handle, sortMethod, labelMask="", label2Mask=""):
+    pass
+
+
+def setContent(handle, content):
+    pass
+
+
+def setPluginCategory(handle, category):
+    pass
@@ -0,0 +1,16 @@
+"""Minimal stand-in for Kodi's xbmcvfs module used by the benchmark harness."""
+
+import os
+
+
+def translatePath(path):
+    return path
+
+
+def mkdirs(path):
+    os.makedirs(path, exist_ok=True)
+    return True
+
+
+def exists(path):
+    return os.path.exists(path)
@@ -8,17 +8,31 @@ from __future__ import annotations  # Enables forward references in older Python
 
 # Kodi plugin boilerplate and plugin-specific modules
 import ast
+import json
+import os
 import sys
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 from urllib.parse import parse_qsl, urlencode
 
 import xbmc
 import xbmcaddon
 import xbmcgui
 import xbmcplugin
-
-from resources.lib.webshare import WebshareAPI
-from resources.lib.csfd import CSFD
+import xbmcvfs
+
+from resources.lib import perf, urlpayload
+from resources.lib.artwork import artwork_for
+from resources.lib.directory import Directory, format_size
+
+# Kodi starts a new interpreter for every click, so the API clients (and with
+# them requests and bs4) are imported only by the routes using them.
+if TYPE_CHECKING:
+    from resources.lib.artwork import ArtworkCache
+    from resources.lib.cache import Cache
+    from resources.lib.csfd import CSFD
+    from resources.lib.history import History
+    from resources.lib.titleindex import TitleIndex
+    from resources.lib.webshare import WebshareAPI
 
 # ----------------------------------------------------------------------------
 # Global variables – provided by Kodi during plugin initialization
@@ -27,6 +41,16 @@ _url: str = sys.argv[0]
 _handle: int = int(sys.argv[1])
 _addon: xbmcaddon.Addon = xbmcaddon.Addon()
 _api: Optional[WebshareAPI] = None
+_csfd: Optional[CSFD] = None
+_cache: Optional[Cache] = None
+_index: Optional[TitleIndex] = None
+_artwork: Optional[ArtworkCache] = None
+
+# Number of Webshare results shown per page
+SEARCH_PAGE_SIZE = 30
+
+# CSFD metadata passed to list_search_results for ranking the results
+RANKING_KEYS = ("title", "original_title", "year", "season", "episode")
 
 # ----------------------------------------------------------------------------
 # Utility functions
@@ -36,14 +60,24 @@ def get_url(**kwargs: Any) -> str:
     """Returns a plugin URL with encoded parameters for recursive calls."""
     return f"{_url}?{urlencode(kwargs)}"
 
-def get_api() -> Optional[WebshareAPI]:
+def get_profile_path(*parts: str) -> str:
+    """Returns a path inside the addon profile directory, creating the directory if needed."""
+    profile = xbmcvfs.translatePath(_addon.getAddonInfo("profile"))
+    if not os.path.isdir(profile):
+        xbmcvfs.mkdirs(profile)
+    return os.path.join(profile, *parts)
+
+def get_api(force_login: bool = False) -> Optional[WebshareAPI]:
     """
     Returns an authenticated instance of WebshareAPI.
+    The session token is persisted in the addon profile, so a new login is done
+    only when no token is stored or when {force_login} is set after the API
+    rejected the stored one.
     Shows error notification on failure.
     """
     global _api
 
-    if _api is not None:
+    if _api is not None and not force_login:
         return _api
 
     username: str = _addon.getSetting("username")
@@ -58,11 +92,13 @@ def get_api() -> Optional[WebshareAPI]:
         )
         return None
 
+    from resources.lib.tokenstore import TokenStore, authenticate
+    from resources.lib.webshare import WebshareAPI
+
+    store = TokenStore(get_profile_path("tokens.json"))
     try:
-        _api = WebshareAPI()
-        _api.login(username, password)
-        if not getattr(_api, "_token", ""):
-            raise RuntimeError("Webshare returned an empty token – check credentials.")
+        _api = WebshareAPI(cache=get_cache())
+        authenticate(_api, store, username, password, force_login)
         return _api
     except Exception as exc:
         xbmcgui.Dialog().notification(
@@ -73,74 +109,211 @@ def get_api() -> Optional[WebshareAPI]:
         )
         return None
 
+def get_int_setting(setting_id: str, default: int) -> int:
+    """Returns a numeric addon setting, falling back to {default} when unset or invalid."""
+    try:
+        return int(float(_addon.getSetting(setting_id)))
+    except ValueError:
+        return default
+
+def get_cache() -> Cache:
+    """Returns the persistent response cache stored in the addon profile."""
+    global _cache
+
+    if _cache is None:
+        from resources.lib.cache import Cache
+
+        _cache = Cache(
+            get_profile_path("cache.db"),
+            max_bytes=get_int_setting("cache_size", 32) * 1024 * 1024,
+        )
+    return _cache
+
+def get_csfd() -> CSFD:
+    """Returns a CSFD scraper configured from the addon settings."""
+    global _csfd
+
+    if _csfd is None:
+        from resources.lib.csfd import CSFD
+
+        _csfd = CSFD(
+            max_workers=get_int_setting("csfd_workers", 4),
+            cache=get_cache(),
+            stale_while_revalidate=_addon.getSettingBool("cache_stale"),
+            index=get_index(),
+        )
+    return _csfd
+
+def get_index() -> TitleIndex:
+    """Returns the local index of CSFD titles seen so far, stored in the addon profile."""
+    global _index
+
+    if _index is None:
+        from resources.lib.titleindex import TitleIndex
+
+        _index = TitleIndex(get_profile_path("titles.db"))
+    return _index
+
+def get_artwork() -> Optional[ArtworkCache]:
+    """Returns the local copy of CSFD list posters, or None when it is turned off."""
+    global _artwork
+
+    max_size = get_int_setting("artwork_cache_size", 32)
+    if _artwork is None and max_size > 0:
+        from resources.lib.artwork import ArtworkCache
+
+        _artwork = ArtworkCache(get_profile_path("artwork"), max_bytes=max_size * 1024 * 1024)
+    return _artwork
+
+def get_history() -> History:
+    """Returns the history of browsed series read by the background service."""
+    from resources.lib.history import History
+
+    return History(get_profile_path("history.json"))
+
 # ----------------------------------------------------------------------------
 # Root menu
 # ----------------------------------------------------------------------------
 
 def list_categories() -> None:
     """Creates items for the plugin's main menu."""
+    directory = Directory(_handle)
     for action, label_id in (
         ("search_webshare", 30011),
         ("search_csfd_movie", 30012),
         ("search_csfd_series", 30013),
     ):
-        item = xbmcgui.ListItem(label=_addon.getLocalizedString(label_id))
-        item.setArt({"icon": "DefaultAddonsSearch.png"})
-        xbmcplugin.addDirectoryItem(_handle, get_url(action=action), item, isFolder=True)
-
-    xbmcplugin.endOfDirectory(_handle)
+        directory.add(get_url(action=action), _addon.getLocalizedString(label_id),
+                      art={"icon": "DefaultAddonsSearch.png"})
+    directory.end()
 
 # ----------------------------------------------------------------------------
 # Playback
 # ----------------------------------------------------------------------------
 
-def play_video(path: str) -> None:
-    """Passes the video URL to Kodi’s internal player."""
+def play_video(ident: str, episode: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Resolves the Webshare download link for {ident} and passes it to Kodi’s
+    internal player. Links are resolved only here, when the user picks an item,
+    and are cached for a while so replaying or resuming a file is instant.
+    When the file is an {episode} of a CSFD series, the background service is
+    told so it can prepare the next one during playback.
+    """
+    api = get_api()
+    if not api:
+        xbmcplugin.setResolvedUrl(_handle, False, xbmcgui.ListItem())
+        return
+
+    try:
+        path = api.get_download_link(ident)
+        # An empty link may mean the stored token has expired – check it and
+        # log in again only if Webshare actually rejects it.
+        if not path and not api.is_token_valid():
+            api = get_api(force_login=True)
+            path = api.get_download_link(ident) if api else ""
+    except Exception as exc:
+        path = ""
+        xbmc.log(f"[{_addon.getAddonInfo('id')}] file_link failed for {ident}: {exc}", xbmc.LOGWARNING)
+
+    if not path:
+        xbmcgui.Dialog().notification(
+            _addon.getAddonInfo("name"),
+            _addon.getLocalizedString(30007).format(_addon.getLocalizedString(30008)),
+            xbmcgui.NOTIFICATION_ERROR,
+            5000,
+        )
+        xbmcplugin.setResolvedUrl(_handle, False, xbmcgui.ListItem())
+        return
+
+    if episode and episode.get("csfd_id") and episode.get("episode") is not None:
+        from resources.lib.warmup import PLAYING_PROPERTY
+
+        xbmcgui.Window(10000).setProperty(PLAYING_PROPERTY, json.dumps(episode))
     xbmcplugin.setResolvedUrl(_handle, True, xbmcgui.ListItem(path=path))
 
 # ----------------------------------------------------------------------------
 # Webshare: search & listing
 # ----------------------------------------------------------------------------
 
-def list_search_results(search_terms: List[str]) -> None:
+def list_search_results(
+    search_terms: List[str],
+    offset: int = 0,
+    meta: Optional[Dict[str, Any]] = None,
+    csfd_id: Optional[str] = None,
+) -> None:
     """
     Displays search results for a list of search terms using WebshareAPI.
-    Adds each result as a playable item.
+    The terms are searched concurrently and files found by several of them
+    are shown once. Adds each result as a playable item carrying only its
+    Webshare ident; the download link is resolved by the `play` route.
+    Shows one page of {SEARCH_PAGE_SIZE} results per term starting at {offset}
+    and a "Next page" item whose results are prefetched in the background.
+    Results are ordered by how well they match the CSFD metadata in {meta}
+    (see RANKING_KEYS), or the first search term when there is none.
+    Opening an episode of series {csfd_id} is recorded in the history.
     """
+    from resources.lib.ranking import Ranker
+
+    meta = {key: value for key, value in (meta or {}).items() if key in RANKING_KEYS and value not in (None, "")}
     api = get_api()
     if not api:
         return
 
     try:
-        for term in search_terms:
-            response = api.search(term)["response"]
-            if int(response.get("total", 0)) == 0:
-                xbmcgui.Dialog().notification(
-                    _addon.getAddonInfo("name"),
-                    _addon.getLocalizedString(30007).format(_addon.getLocalizedString(30008)),
-                    xbmcgui.NOTIFICATION_ERROR,
-                    5000,
-                )
-                continue
-
-            for file_info in response["file"]:
-                item = xbmcgui.ListItem(label=file_info["name"])
-                item.setInfo("video", {
-                    "title": file_info.get("name", term),
-                    "size": int(file_info.get("size", 0)),
-                })
-                item.setArt({"poster": file_info.get("img", ""), "fanart": file_info.get("img", "")})
-
-                video_url = api.get_download_link(file_info["ident"])
-                if not video_url:
-                    continue
-
-                item.setProperty("IsPlayable", "true")
-                xbmcplugin.addDirectoryItem(_handle, get_url(action="play", video=video_url), item, isFolder=False)
-
-        xbmcplugin.addSortMethod(_handle, xbmcplugin.SORT_METHOD_NONE)
-        xbmcplugin.setContent(_handle, "videos")
-        xbmcplugin.endOfDirectory(_handle)
+        files, counts = api.search_many(search_terms, limit=SEARCH_PAGE_SIZE, offset=offset)
+        # Terms which filled their page may have more results
+        next_terms = [term for term, count in counts.items() if count >= SEARCH_PAGE_SIZE]
+        has_next_page = bool(next_terms)
+
+        ranker = Ranker(**meta) if meta.get("title") else Ranker(title=search_terms[0])
+        with perf.span("rank"):
+            files = ranker.rank(files)
+
+        # Result pages change between visits, Kodi must not serve them from its disc cache
+        directory = Directory(
+            _handle, content="videos", cache_to_disc=False, sort_methods=(xbmcplugin.SORT_METHOD_NONE,),
+        )
+        # Episodes carry their series, so the service knows what comes next while one plays
+        episode = None
+        if csfd_id and "season" in meta and "episode" in meta:
+            episode = urlpayload.encode({"csfd_id": csfd_id, **meta})
+        for file in files:
+            directory.add(
+                get_url(action="play", ident=file.ident, **({"p": episode} if episode else {})),
+                file.name,
+                is_folder=False,
+                label2=format_size(file.size),
+                info={"title": file.name or file.queries[0], "mediatype": "video"},
+                art=artwork_for(webshare_img=file.img),
+                properties={"IsPlayable": "true"},
+            )
+
+        if not files and offset == 0:
+            xbmcgui.Dialog().notification(
+                _addon.getAddonInfo("name"),
+                _addon.getLocalizedString(30007).format(_addon.getLocalizedString(30008)),
+                xbmcgui.NOTIFICATION_ERROR,
+                5000,
+            )
+
+        next_offset = offset + SEARCH_PAGE_SIZE
+        if has_next_page:
+            url = get_url(
+                action="list_search_results",
+                p=urlpayload.encode({"queries": next_terms, "csfd_id": csfd_id, **meta}),
+                offset=next_offset,
+            )
+            directory.add(url, _addon.getLocalizedString(30021), art={"icon": "DefaultFolder.png"})
+        directory.end()
+
+        # Writing the history is not needed for the listing, do it once it is shown
+        if csfd_id and offset == 0 and "season" in meta and "episode" in meta:
+            get_history().set_episode(csfd_id, meta["season"], meta["episode"])
+
+        # The list is already shown – fetch the next page while the user looks at it
+        if has_next_page:
+            for term in next_terms:
+                api.prefetch_search(term, limit=SEARCH_PAGE_SIZE, offset=next_offset)
     except Exception as exc:
         xbmcgui.Dialog().notification(
             _addon.getAddonInfo("name"),
@@ -179,46 +352,86 @@ def search_webshare() -> None:
 # CSFD – search results
 # ----------------------------------------------------------------------------
 
-def list_csfd_results(results: List[Dict[str, Any]], search_type: str) -> None:
-    """Displays CSFD search results as Kodi menu items."""
+def list_csfd_results(
+    results: List[Dict[str, Any]],
+    search_type: str,
+    online_query: Optional[str] = None,
+) -> None:
+    """
+    Displays CSFD search results as Kodi menu items.
+    With {online_query} the results come from the local title index and are
+    preceded by an item running the same search on CSFD.
+    """
+    directory = Directory(_handle, content="movies" if search_type == "movie" else "tvshows", cache_to_disc=False)
+    artwork = get_artwork()
+    if online_query:
+        url = get_url(action="search_csfd_online", query=online_query, search_type=search_type)
+        directory.add(url, _addon.getLocalizedString(30025), art={"icon": "DefaultAddonsSearch.png"})
+
     for result in results:
         title = result["title"]
         year = result.get("year")
         label = f"{title} ({year})" if year else title
 
-        item = xbmcgui.ListItem(label=label)
-        item.setInfo("video", {
-            "title": title,
-            "year": year,
-            "plot": result.get("plot"),
-            "rating": result.get("rating"),
-        })
-        item.setArt({"poster": result.get("poster", ""), "fanart": result.get("poster", "")})
-
-        url = get_url(action="select_csfd", csfd_id=result["id"], search_type=search_type)
-        xbmcplugin.addDirectoryItem(_handle, url, item, isFolder=True)
-
-    xbmcplugin.endOfDirectory(_handle)
+        # The listed metadata travels with the URL, so a movie needs no detail fetch on selection
+        payload = urlpayload.encode({key: result.get(key) for key in ("title", "original_title", "year", "poster", "partial")})
+        directory.add(
+            get_url(action="select_csfd", csfd_id=result["id"], search_type=search_type, p=payload),
+            label,
+            info={
+                "title": title,
+                "originaltitle": result.get("original_title"),
+                "year": year,
+                "plot": result.get("plot"),
+                "rating": result.get("rating"),
+                "genre": result.get("genres"),
+                "mediatype": "movie" if search_type == "movie" else "tvshow",
+            },
+            art=artwork_for(result.get("poster"), cache=artwork),
+        )
+    directory.end()
+    if artwork is not None:
+        artwork.fetch_missing()
 
 # ----------------------------------------------------------------------------
 # CSFD – selection and detailed episode listing
 # ----------------------------------------------------------------------------
 
-def handle_csfd_selection(csfd_id: str, search_type: str) -> None:
-    """Handles selection from CSFD and delegates search or episode listing."""
-    csfd = CSFD()
-    details = csfd.get_detail(csfd_id)
+def handle_csfd_selection(csfd_id: str, search_type: str, meta: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Handles selection from CSFD and delegates search or episode listing.
+    Movie details already carried in {meta} are used without fetching them again,
+    unless they come from a shallow search and are only partial.
+    """
+    csfd = get_csfd()
 
     if search_type == "movie":
-        queries: List[str] = [f"{details['title']} {details['year']}"]
+        if meta and meta.get("title") and not meta.get("partial"):
+            details = meta
+        else:
+            # Hits of a shallow search are not in the index as movies yet, the detail page adds them
+            details = csfd.get_detail(csfd_id, type="movie")
+        # Payloads and index entries leave out unknown fields, the year may be missing
+        year = details.get("year")
+        queries: List[str] = [f"{details['title']} {year}" if year else details["title"]]
         if details.get("original_title") and details["original_title"] != details["title"]:
             queries.append(details["original_title"])
-        list_search_results(queries)
+        list_search_results(queries, meta={
+            "title": details["title"],
+            "original_title": details.get("original_title"),
+            "year": details.get("year"),
+        })
         return
 
-    # Series → show list of seasons
-    seasons = csfd.get_seasons(csfd_id)
-    list_seasons(seasons, details["title"], details.get("original_title"), csfd_id)
+    # Series → details, seasons and episodes come from one overview page
+    overview = csfd.get_overview(csfd_id)
+    details = overview["details"]
+    if overview["episodes"]:
+        # Series without seasons lists its episodes right away
+        render_episodes(overview["episodes"], details["title"], details.get("original_title") or "", csfd_id)
+    else:
+        list_seasons(overview["seasons"], details["title"], details.get("original_title"), csfd_id)
+    get_history().add_series(csfd_id, details["title"], details.get("original_title"))
 
 # ----------------------------------------------------------------------------
 # CSFD – episode navigation
@@ -231,6 +444,7 @@ def list_seasons(
     csfd_id: str,
 ) -> None:
     """Displays list of seasons for a series."""
+    directory = Directory(_handle, content="seasons")
     for season in seasons:
         label = season["title"] if season["title"] != "Season" else f"Season {season['number']}"
         url = get_url(
@@ -240,9 +454,10 @@ def list_seasons(
             series_title=series_title,
             original_title=original_title or "",
         )
-        xbmcplugin.addDirectoryItem(_handle, url, xbmcgui.ListItem(label=label), isFolder=True)
-
-    xbmcplugin.endOfDirectory(_handle)
+        directory.add(url, label, info={
+            "tvshowtitle": series_title, "season": season["number"], "mediatype": "season",
+        })
+    directory.end()
 
 def list_episodes(
     csfd_id: str,
@@ -251,52 +466,149 @@ def list_episodes(
     original_title: str,
 ) -> None:
     """Displays episode list for a given season."""
-    csfd = CSFD()
-    episodes = csfd.get_episodes(csfd_id, season_id)
+    episodes = get_csfd().get_episodes(csfd_id, season_id)
+    render_episodes(episodes, series_title, original_title, csfd_id)
 
-    for ep in episodes:
+def render_episodes(
+    episodes: List[Dict[str, Any]],
+    series_title: str,
+    original_title: str,
+    csfd_id: str,
+) -> None:
+    """
+    Displays episodes as folders searching Webshare for their SxxEyy.
+    With the episode_scan setting the searches of all episodes are run up
+    front (see scan_episodes) and each item shows its number of files and
+    best match; episodes without any file of that episode are greyed out.
+    """
+    from resources.lib.warmup import episode_queries
+
+    episode_queries_list = [
+        episode_queries(series_title, original_title, ep.get("season") or 0, ep.get("number") or 0)
+        for ep in episodes
+    ]
+    scan = None
+    if _addon.getSettingBool("episode_scan"):
+        scan = scan_episodes(episodes, episode_queries_list, series_title, original_title)
+
+    # A scanned listing shows availability, which changes; plain episode lists are stable
+    directory = Directory(_handle, content="episodes", cache_to_disc=scan is None)
+    for index, (ep, queries) in enumerate(zip(episodes, episode_queries_list)):
         season_no = ep.get("season") or 0
         ep_no = ep.get("number") or 0
         label = f"{ep_no}. {ep['title']}"
+        label2 = ""
+        info = {
+            "title": ep["title"],
+            "tvshowtitle": series_title,
+            "season": season_no,
+            "episode": ep_no,
+            "mediatype": "episode",
+        }
+        if scan is not None:
+            count, best = scan[index]
+            if count:
+                label = f"{label} ({count})"
+                label2 = info["plot"] = best.name
+            else:
+                label = f"[COLOR grey]{label} (0)[/COLOR]"
+
+        url = get_url(action="list_search_results", p=urlpayload.encode({
+            "queries": queries,
+            "csfd_id": csfd_id,
+            "title": series_title,
+            "original_title": original_title,
+            "season": season_no,
+            "episode": ep_no,
+        }))
+        directory.add(url, label, label2=label2, info=info)
+    directory.end()
+
+def scan_episodes(
+    episodes: List[Dict[str, Any]],
+    episode_queries_list: List[List[str]],
+    series_title: str,
+    original_title: str,
+) -> Optional[List[Any]]:
+    """
+    Runs the Webshare searches of all episodes in one batch on a bounded pool.
+    Returns (number of files, best ranked file) per episode, counting only
+    files named with the episode's SxxEyy, or None when Webshare cannot be
+    searched. The pages are cached, so opening an episode afterwards needs
+    no request.
+    """
+    from resources.lib.ranking import Ranker
 
-        queries: List[str] = [f"{series_title} S{season_no:02d}E{ep_no:02d}"]
-        if original_title and original_title != series_title:
-            queries.append(f"{original_title} S{season_no:02d}E{ep_no:02d}")
-
-        url = get_url(action="list_search_results", query=str(queries))
-        xbmcplugin.addDirectoryItem(_handle, url, xbmcgui.ListItem(label=label), isFolder=True)
+    api = get_api()
+    if not api:
+        return None
+    try:
+        with perf.span("episode_scan"):
+            all_queries = [query for queries in episode_queries_list for query in queries]
+            files, _ = api.search_many(all_queries, limit=SEARCH_PAGE_SIZE)
+    except Exception as exc:
+        xbmc.log(f"[{_addon.getAddonInfo('id')}] Episode scan failed: {exc}", xbmc.LOGWARNING)
+        return None
 
-    xbmcplugin.endOfDirectory(_handle)
+    # Every merged file lists the queries that found it, which maps it back to its episodes
+    by_query: Dict[str, List[Any]] = {}
+    for file in files:
+        for query in file.queries:
+            by_query.setdefault(query, []).append(file)
+
+    results = []
+    for ep, queries in zip(episodes, episode_queries_list):
+        ranker = Ranker(
+            title=series_title, original_title=original_title,
+            season=ep.get("season") or 0, episode=ep.get("number") or 0,
+        )
+        # Webshare's fuzzy search also returns neighbouring episodes, they do not count
+        found = [
+            file for file in {file.ident: file for query in queries for file in by_query.get(query, [])}.values()
+            if ranker.matches_episode(file.name)
+        ]
+        results.append((len(found), ranker.rank(found)[0]) if found else (0, None))
+    return results
 
 # ----------------------------------------------------------------------------
 # CSFD – search entry points
 # ----------------------------------------------------------------------------
 
+def search_csfd(term: str, search_type: str) -> None:
+    """
+    Lists CSFD titles matching {term}. Titles seen before are listed at once
+    from the local index (unless disabled in settings); CSFD itself is
+    searched only when there are no local hits or the user asks for it.
+    """
+    if _addon.getSettingBool("local_search"):
+        hits = get_index().search(term, search_type)
+        if hits:
+            list_csfd_results(hits, search_type, online_query=term)
+            return
+    search_csfd_online(term, search_type)
+
+def search_csfd_online(term: str, search_type: str) -> None:
+    """Searches CSFD for {term} and lists the hits."""
+    xbmcgui.Dialog().notification(
+        _addon.getAddonInfo("name"),
+        _addon.getLocalizedString(30002).format(term),
+        xbmcgui.NOTIFICATION_INFO,
+        2000,
+    )
+    results = get_csfd().search(term, type=search_type, shallow=_addon.getSettingBool("csfd_shallow"))
+    list_csfd_results(results, search_type)
+
 def search_csfd_movie() -> None:
     """Search dialog for CSFD movie titles."""
     term = _keyboard_search(30014)
     if term:
-        xbmcgui.Dialog().notification(
-            _addon.getAddonInfo("name"),
-            _addon.getLocalizedString(30002).format(term),
-            xbmcgui.NOTIFICATION_INFO,
-            2000,
-        )
-        results = CSFD().search(term, type="movie")
-        list_csfd_results(results, "movie")
+        search_csfd(term, "movie")
 
 def search_csfd_series() -> None:
     """Search dialog for CSFD TV series titles."""
     term = _keyboard_search(30015)
     if term:
-        xbmcgui.Dialog().notification(
-            _addon.getAddonInfo("name"),
-            _addon.getLocalizedString(30002).format(term),
-            xbmcgui.NOTIFICATION_INFO,
-            2000,
-        )
-        results = CSFD().search(term, type="series")
-        list_csfd_results(results, "series")
+        search_csfd(term, "series")
 
 # ----------------------------------------------------------------------------
 # Placeholder for unimplemented features
@@ -327,15 +639,18 @@ def router(paramstring: str) -> None:
     if action == "listing":
         list_videos(params["category"])
     elif action == "play":
-        play_video(params["video"])
+        play_video(params["ident"], urlpayload.decode(params["p"]) if "p" in params else None)
     elif action == "search_webshare":
         search_webshare()
     elif action == "search_csfd_movie":
         search_csfd_movie()
     elif action == "search_csfd_series":
         search_csfd_series()
+    elif action == "search_csfd_online":
+        search_csfd_online(params["query"], params["search_type"])
     elif action == "select_csfd":
-        handle_csfd_selection(params["csfd_id"], params["search_type"])
+        meta = urlpayload.decode(params["p"]) if "p" in params else None
+        handle_csfd_selection(params["csfd_id"], params["search_type"], meta)
     elif action == "list_episodes":
         list_episodes(
             params["csfd_id"],
@@ -344,19 +659,70 @@ def router(paramstring: str) -> None:
             params.get("original_title", ""),
         )
     elif action == "list_search_results":
-        raw_query = params["query"]
-        try:
-            query_list = ast.literal_eval(raw_query)
-            if not isinstance(query_list, list):
+        if "p" in params:
+            payload = urlpayload.decode(params["p"])
+            query_list = payload.get("queries") or []
+        else:
+            # URLs from before the payload codec (favourites, history) carry str(list)
+            payload = params
+            raw_query = params["query"]
+            try:
+                query_list = ast.literal_eval(raw_query)
+                if not isinstance(query_list, list):
+                    query_list = [raw_query]
+            except (ValueError, SyntaxError):
                 query_list = [raw_query]
-        except (ValueError, SyntaxError):
-            query_list = [raw_query]
-        list_search_results([str(q) for q in query_list])
+        meta = {key: payload[key] for key in RANKING_KEYS if payload.get(key) not in (None, "")}
+        list_search_results([str(q) for q in query_list], int(params.get("offset", 0)), meta, payload.get("csfd_id"))
     else:
         raise ValueError(f"Invalid paramstring: {paramstring}!")
 
+# ----------------------------------------------------------------------------
+# Performance instrumentation
+# ----------------------------------------------------------------------------
+
+def report_performance(paramstring: str) -> None:
+    """Writes the timing summary of this invocation to the Kodi log and the rolling profile."""
+    route = dict(parse_qsl(paramstring)).get("action") or "root"
+    summary = perf.get_profiler().summary(route)
+    if "resources.lib.policy" in sys.modules:
+        # Retry, throttling and circuit breaker counters of the hosts contacted
+        summary["policy"] = sys.modules["resources.lib.policy"].get_policy().counters()
+    xbmc.log(f"[{_addon.getAddonInfo('id')}] {perf.format_summary(summary)}", xbmc.LOGINFO)
+    try:
+        perf.write_profile(get_profile_path("perf.json"), summary)
+    except OSError as exc:
+        xbmc.log(f"[{_addon.getAddonInfo('id')}] Failed to write perf.json: {exc}", xbmc.LOGWARNING)
+
 # ----------------------------------------------------------------------------
 if __name__ == "__main__":
     # Kodi passes plugin parameters in `sys.argv[2]`, including the leading '?'
     # This may be missing during CLI testing – handle gracefully.
-    router(sys.argv[2][1:] if len(sys.argv) > 2 and sys.argv[2].startswith("?") else "")
\ No newline at end of file
+    paramstring = sys.argv[2][1:] if len(sys.argv) > 2 and sys.argv[2].startswith("?") else ""
+
+    profiler = perf.get_profiler()
+    profiler.enabled = _addon.getSettingBool("perf_log")
+    profiler.reset()
+    cprofile = None
+    if profiler.enabled and _addon.getSettingBool("perf_cprofile"):
+        import cProfile
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+
+    with perf.span("router"):
+        router(paramstring)
+    # Let background refreshes and prefetches finish before the interpreter exits
+    with perf.span("background"):
+        if _csfd is not None:
+            _csfd.wait_for_revalidations()
+        if _api is not None:
+            _api.wait_for_prefetches()
+        if _artwork is not None:
+            _artwork.wait()
+
+    if cprofile is not None:
+        cprofile.disable()
+        route = dict(parse_qsl(paramstring)).get("action") or "root"
+        cprofile.dump_stats(get_profile_path(f"cprofile-{route}.prof"))
+    if profiler.enabled:
+        report_performance(paramstring)
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Image widths requested from CSFD's image server per artwork type
+SIZES = {
+    'thumb': 140,
+    'poster': 360,
+    'fanart': 1080,
+}
+
+# image.pmgstatic.com serves resized variants of every file under /cache/resized/w{width}/
+_CSFD_IMAGE_RE = re.compile(r'^(?:https?:)?//image\.pmgstatic\.com/(?:cache/resized/w\d+(?:h\d+)?/)?(files/.+)$')
+
+
+def csfd_image(url, kind: str = 'poster') -> str:
+    """Returns the variant of CSFD image {url} sized for {kind} (see SIZES), other URLs unchanged"""
+    if not url:
+        return ''
+    match = _CSFD_IMAGE_RE.match(url)
+    if not match:
+        return url
+    return f"https://image.pmgstatic.com/cache/resized/w{SIZES[kind]}/{match.group(1)}"
+
+
+def artwork_for(poster=None, webshare_img=None, cache=None):
+    """
+    Returns a setArt() dict for a CSFD {poster} and/or a Webshare preview
+    image, sized for list rows; only fanart uses the large variant.
+
+    With {cache} (an ArtworkCache) a poster stored locally serves as both
+    thumb and poster. A poster not stored yet is handed to Kodi by URL and
+    queued for the cache, costing one extra download of it the first time.
+    Webshare previews are rarely listed twice and are left to Kodi's own
+    texture cache.
+    """
+    art = {}
+    if poster:
+        local = cache.get(csfd_image(poster, 'poster')) if cache is not None else None
+        if local is not None:
+            art['thumb'] = art['poster'] = local
+        else:
+            art['thumb'] = csfd_image(poster, 'thumb')
+            art['poster'] = csfd_image(poster, 'poster')
+        art['fanart'] = csfd_image(poster, 'fanart')
+    if webshare_img:
+        # Webshare previews are small frames, fine as a thumbnail but not as a poster
+        art['thumb'] = webshare_img
+    return art
+
+
+class ArtworkCache:
+    """
+    Bounded local copy of CSFD list posters.
+
+    Images are stored as files in {directory} so Kodi can load them without
+    touching the network. Lookups never download: misses are remembered and
+    fetched later by fetch_missing(), normally after the listing is shown.
+    The least recently used files are deleted once the total size exceeds
+    {max_bytes}.
+    """
+
+    # Access times are refreshed at most this often, saving a write per listed item
+    TOUCH_INTERVAL = 24 * 60 * 60
+
+    def __init__(self, directory, max_bytes: int = 32 * 1024 * 1024, session=None, max_workers: int = 4):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_workers = max_workers
+        # Created on first download, listing from the cache needs no HTTP stack
+        self._session = session
+        self._missing = []
+        self._threads = []
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, url) -> str:
+        extension = os.path.splitext(url.split('?', 1)[0])[1].lower()
+        if extension not in ('.jpg', '.jpeg', '.png', '.webp', '.gif'):
+            extension = '.img'
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + extension)
+
+    def get(self, url):
+        """Returns the path of the local copy of {url}, or None (queuing its download) when there is none"""
+        if not url or not url.startswith(('http://', 'https://')):
+            return None
+        path = self.path_for(url)
+        try:
+            accessed = os.path.getmtime(path)
+        except OSError:
+            if url not in self._missing:
+                self._missing.append(url)
+            return None
+        if time.time() - accessed > self.TOUCH_INTERVAL:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return path
+
+    def fetch(self, url) -> bool:
+        """Downloads {url} into the cache, returning False on failure"""
+        if self._session is None:
+            from resources.lib.transport import get_session
+            self._session = get_session()
+        try:
+            response = self._session.get(url)
+        except Exception as e:
+            print(f"Failed to fetch artwork {url}: {str(e)}")
+            return False
+        content_type = response.headers.get('Content-Type', '')
+        if response.status_code != 200 or not content_type.startswith('image/'):
+            return False
+        path = self.path_for(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(response.content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Failed to store artwork {url}: {str(e)}")
+            return False
+        return True
+
+    def fetch_missing(self):
+        """Starts downloading the images missed by get() in the background"""
+        urls, self._missing = self._missing, []
+        if not urls:
+            return
+
+        def run():
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as executor:
+                list(executor.map(self.fetch, urls))
+            self._evict()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self._threads.append(thread)
+
+    def wait(self):
+        """Blocks until background downloads are done"""
+        while self._threads:
+            self._threads.pop().join()
+
+    def _evict(self):
+        try:
+            entries = [(entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                       for entry in os.scandir(self.directory) if entry.is_file()]
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
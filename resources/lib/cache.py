@@ -0,0 +1,116 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored REAL NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+'''
+
+
+class CacheEntry(namedtuple('CacheEntry', 'value etag last_modified stored expires')):
+    """Single cached value together with the validators of its source"""
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires > time.time()
+
+    def json(self):
+        return json.loads(self.value)
+
+
+class Cache:
+    """
+    Persistent SQLite backed key/value cache.
+
+    Every entry has its own TTL and may carry the ETag/Last-Modified
+    validators of the page it was built from, so an expired entry can be
+    revalidated with a conditional request. The total size is capped and
+    the least recently used entries are evicted first.
+    """
+
+    def __init__(self, path, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by worker threads, serialized by the lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(_SCHEMA)
+
+    def get(self, key):
+        """Returns the CacheEntry for {key}, expired or not, or None if missing"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, etag, last_modified, stored, expires FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (time.time(), key))
+        return CacheEntry(*row)
+
+    def get_fresh(self, key):
+        """Returns the value stored under {key} only if it has not expired yet"""
+        entry = self.get(key)
+        return entry.value if entry is not None and entry.fresh else None
+
+    def set(self, key, value, ttl, etag=None, last_modified=None):
+        """Stores {value} (str or bytes) under {key} for {ttl} seconds"""
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO entries (key, value, etag, last_modified, stored, expires, accessed, size) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, value, etag, last_modified, now, now + ttl, now, len(value)),
+            )
+            self._evict()
+
+    def set_json(self, key, value, ttl, etag=None, last_modified=None):
+        self.set(key, json.dumps(value, ensure_ascii=False), ttl, etag, last_modified)
+
+    def touch(self, key, ttl):
+        """Extends the lifetime of {key} after a successful revalidation"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'UPDATE entries SET expires = ?, accessed = ? WHERE key = ?', (now + ttl, now, key)
+            )
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def _evict(self):
+        """Drops least recently used entries until the size cap is met (lock must be held)"""
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute('SELECT key, size FROM entries ORDER BY accessed ASC').fetchall()
+        victims = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany('DELETE FROM entries WHERE key = ?', victims)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
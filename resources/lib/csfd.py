@@ -1,9 +1,27 @@
-import requests
 import random
 import json
 import re
-from typing import Literal, Dict, List
-from bs4 import BeautifulSoup
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal, Dict, List, Optional
+from resources.lib import perf
+from resources.lib.htmlparse import get_backend
+from resources.lib.policy import ServiceUnavailable
+from resources.lib.transport import get_session
+
+
+class CSFDError(Exception):
+    """Raised when CSFD answers a page request with an HTTP error"""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def transient(self) -> bool:
+        """True for throttling and server errors, which may go away on their own"""
+        return self.status_code == 429 or self.status_code >= 500
+
 
 class CSFD:
     """
@@ -15,19 +33,210 @@ class CSFD:
         'Mozilla/5.0 (Linux; Android 10; SM-A205U) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/87.0.4280.101 Mobile Safari/537.36',
         'Mozilla/5.0 (Linux; Android 10) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/87.0.4280.101 Mobile Safari/537.36'
     ]
-    def __init__(self):
+    # Lifetime of cached results per endpoint, in seconds
+    CACHE_TTL = {
+        "search": 60 * 60,
+        "detail": 24 * 60 * 60,
+        "seasons": 12 * 60 * 60,
+        "episodes": 12 * 60 * 60,
+        "overview": 12 * 60 * 60,
+    }
+
+    # Elements read by each parser, used by the fast extraction backend
+    DETAIL_TARGETS = {
+        'h1': None,
+        'img': {'prev-img'},
+        'div': {'plot-full', 'origin', 'film-rating-average', 'genres'},
+        'ul': {'film-names'},
+    }
+    EPISODES_TARGETS = {
+        'div': {'film-episodes-list'},
+    }
+    OVERVIEW_TARGETS = {
+        **DETAIL_TARGETS,
+        'div': DETAIL_TARGETS['div'] | EPISODES_TARGETS['div'],
+    }
+    SEARCH_TARGETS = {
+        'article': {'article-poster-50'},
+    }
+
+    def __init__(self, max_workers: int = 4, session=None, cache=None, stale_while_revalidate: bool = False,
+                 parser: str = "fast", index=None):
+        self._session = session or get_session()
         self.base_url = "https://www.csfd.cz/"
+        # Number of detail pages fetched concurrently by search()
+        self.max_workers = max(1, int(max_workers))
+        # Optional resources.lib.cache.Cache for parsed results
+        self.cache = cache
+        self.stale_while_revalidate = stale_while_revalidate
+        self._revalidations = []
+        # HTML extraction backend, see resources.lib.htmlparse.BACKENDS
+        self._parse_html = get_backend(parser)
+        # Optional resources.lib.titleindex.TitleIndex filled with every parsed title
+        self.index = index
         
-    def get_detail(self, full_id):
-        url = f"{self.base_url}/film/{full_id}/prehled"
+    def _load(self, kind, key, url, parse, description, title_kind=None):
+        with perf.span(f"csfd.{kind}"):
+            return self._load_cached(kind, key, url, self._indexing(kind, key, parse, title_kind), description)
+
+    def _indexing(self, kind, key, parse, title_kind=None):
+        """
+        Wraps {parse} so freshly parsed titles are added to the title index,
+        as {title_kind} ('movie' or 'series') when it is known.
+        """
+        if self.index is None:
+            return parse
+
+        def parse_and_index(content):
+            result = parse(content)
+            try:
+                self._index_result(kind, key, result, title_kind)
+            except Exception as e:
+                print(f"Failed to index {kind} {key}: {str(e)}")
+            return result
+        return parse_and_index
+
+    def _index_result(self, kind, key, result, title_kind=None):
+        if kind == "detail":
+            self.index.add(key, result, title_kind)
+        elif kind == "overview":
+            self.index.add(key, result['details'], 'series')
+            self.index.add_seasons(key, result['seasons'])
+            self.index.add_episodes(key, result['episodes'])
+        elif kind == "seasons":
+            self.index.add_seasons(key, result)
+        elif kind == "episodes":
+            self.index.add_episodes(key.split('/')[0], result)
+
+    def _load_cached(self, kind, key, url, parse, description):
+        """
+        Returns the parsed result of page {url}, going through the cache if one is set.
+
+        Fresh entries are returned without any request. Expired entries are
+        revalidated with a conditional GET (ETag/Last-Modified), or returned
+        as they are while a background refresh runs if stale_while_revalidate
+        is enabled. While CSFD is down or throttling, expired entries are
+        served instead of failing.
+        """
+        if self.cache is None:
+            return self._fetch(kind, None, url, parse, description)
+
+        cache_key = f"csfd:{kind}:{key}"
+        entry = self.cache.get(cache_key)
+        if entry is not None:
+            if entry.fresh:
+                return entry.json()
+            if self.stale_while_revalidate:
+                thread = threading.Thread(
+                    target=self._revalidate_quietly,
+                    args=(kind, cache_key, url, parse, description, entry),
+                )
+                thread.start()
+                self._revalidations.append(thread)
+                return entry.json()
+        try:
+            return self._fetch(kind, cache_key, url, parse, description, entry)
+        except (CSFDError, ServiceUnavailable) as e:
+            if entry is None or (isinstance(e, CSFDError) and not e.transient):
+                raise
+            print(f"Serving cached copy, failed to {description}: {str(e)}")
+            return entry.json()
+
+    def _fetch(self, kind, cache_key, url, parse, description, entry=None):
+        """Downloads and parses {url}, storing the result under {cache_key}"""
         headers = {
-            "User-Agent":random.choice(self.USER_AGENTS)
+            "User-Agent": random.choice(self.USER_AGENTS)
         }
-        response = requests.get(url, headers=headers)
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        response = self._session.get(url, headers=headers)
+        ttl = self.CACHE_TTL[kind]
+        if response.status_code == 304 and entry is not None:
+            self.cache.touch(cache_key, ttl)
+            return entry.json()
         if 600 > response.status_code >= 400:
-            raise Exception(f"Failed to get detail for {full_id}\nStatus code: {response.status_code}\nResponse: {response.text}")
-        
-        soup = BeautifulSoup(response.text.encode('utf-8'), "html.parser")
+            raise CSFDError(
+                f"Failed to {description}\nStatus code: {response.status_code}\nResponse: {response.text}",
+                response.status_code,
+            )
+
+        with perf.span(f"csfd.parse.{kind}"):
+            result = parse(response.content)
+        if cache_key is not None:
+            self.cache.set_json(
+                cache_key, result, ttl,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        return result
+
+    def _revalidate_quietly(self, *args):
+        try:
+            self._fetch(*args)
+        except Exception as e:
+            print(f"Background refresh of {args[2]} failed: {str(e)}")
+
+    def wait_for_revalidations(self):
+        """Blocks until background refreshes started by stale reads are done"""
+        while self._revalidations:
+            self._revalidations.pop().join()
+
+    def get_detail(self, full_id, type: Optional[Literal["movie", "series"]] = None):
+        """Get details of a title; a known {type} is recorded in the title index"""
+        url = f"{self.base_url}/film/{full_id}/prehled"
+        return self._load("detail", full_id, url, self._parse_detail, f"get detail for {full_id}", type)
+
+    def get_overview(self, full_id):
+        """
+        Get details, seasons and episodes of a title from a single fetch and parse
+        of its overview page.
+
+        Series split into seasons return the seasons and an empty episode list,
+        series without seasons list their episodes directly.
+
+        :param full_id: CSFD ID of the title
+        :type full_id: str
+        :return: Dict with 'details', 'seasons' and 'episodes'
+        :rtype: dict
+        """
+        url = f"{self.base_url}/film/{full_id}/prehled"
+        return self._load("overview", full_id, url, self._parse_overview, f"get overview for {full_id}")
+
+    def _parse_overview(self, content):
+        soup = self._soup(content, self.OVERVIEW_TARGETS)
+        seasons = []
+        episodes = []
+        if self._lists_episodes(soup):
+            episodes = self._extract_episodes(soup)
+        else:
+            seasons = self._extract_seasons(soup)
+        return {
+            'details': self._extract_detail(soup),
+            'seasons': seasons,
+            'episodes': episodes,
+        }
+
+    def _soup(self, content, targets=None):
+        return self._parse_html(content, targets)
+
+    def _lists_episodes(self, soup) -> bool:
+        """Checks whether the film-episodes-list holds episodes (SxxEyy) rather than seasons"""
+        episodes_list = soup.find('div', class_='film-episodes-list')
+        if not episodes_list:
+            return False
+        for info in episodes_list.find_all('span', class_='info'):
+            if re.search(r'S(\d+)E(\d+)', info.text):
+                return True
+        return False
+
+    def _parse_detail(self, content):
+        return self._extract_detail(self._soup(content, self.DETAIL_TARGETS))
+
+    def _extract_detail(self, soup):
         
         # Extract poster URL
         poster_elem = soup.find('img', {'class': 'prev-img'})
@@ -88,18 +297,38 @@ class CSFD:
             'poster': poster
         }
 
-    def search(self, query, type: Literal["movie", "series"] = "movie") -> List[Dict]:
+    def search(self, query, type: Literal["movie", "series"] = "movie", shallow: bool = False) -> List[Dict]:
+        """
+        Searches CSFD for titles of {type}.
+
+        By default the detail page of every hit is loaded as well. A
+        {shallow} search makes the single search request and returns what
+        the results page shows (title, year, poster thumbnail), completed
+        with details already in the cache; such hits are marked 'partial'.
+        """
         url = f"{self.base_url}/hledat/?q={query}"
-        headers = {
-            "User-Agent": random.choice(self.USER_AGENTS)
-        }
-        response = requests.get(url, headers=headers)
-        if 600 > response.status_code >= 400:
-            raise Exception(f"Failed to search for {query}\nStatus code: {response.status_code}\nResponse: {response.text}")
-        
-        soup = BeautifulSoup(response.text.encode('utf-8'), "html.parser")
+        hits = self._load(
+            "search", f"{type}:{query}", url,
+            lambda content: self._parse_search(content, type),
+            f"search for {query}",
+        )
+
+        if shallow:
+            return [self._cached_search_detail(hit, type) for hit in hits]
+
+        # Get full details for each result on a bounded pool; map() keeps the
+        # original order and failed items are dropped individually.
+        if not hits:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(hits))) as executor:
+            details_list = list(executor.map(lambda hit: self._search_detail(hit['id'], type), hits))
+        return [details for details in details_list if details is not None]
+
+    def _parse_search(self, content, type) -> List[Dict]:
+        """Returns the search hits matching {type}: id, title, year and poster"""
+        soup = self._soup(content, self.SEARCH_TARGETS)
         
-        results = []
+        hits = []
         articles = soup.find_all('article', class_='article-poster-50')
         
         for article in articles:
@@ -122,19 +351,64 @@ class CSFD:
                 
             href = title_elem.get('href', '')
             full_id = href.split('/')[-2] if href else None
-            
-            if full_id:
-                try:
-                    # Get full details for each result
-                    details = self.get_detail(full_id)
-                    details['id'] = full_id
-                    details['type'] = type
-                    results.append(details)
-                except Exception as e:
-                    print(f"Failed to get details for {full_id}: {str(e)}")
-                    continue
-        
-        return results
+            if not full_id:
+                continue
+
+            year = None
+            if title_info:
+                year_match = re.search(r'\((\d{4})\)', title_info.text)
+                if year_match:
+                    year = year_match.group(1)
+
+            poster = None
+            poster_elem = article.find('img')
+            if poster_elem and poster_elem.get('src'):
+                poster = poster_elem['src']
+                if poster.startswith('//'):
+                    poster = 'https:' + poster
+
+            hits.append({
+                'id': full_id,
+                'title': title_elem.text.strip(),
+                'year': year,
+                'poster': poster,
+            })
+
+        return hits
+
+    def _cached_search_detail(self, hit, type) -> Dict:
+        """Completes a search {hit} with details from the cache, without any request"""
+        result = {**hit, 'type': type, 'partial': True}
+        if self.cache is None:
+            return result
+        # Expired entries are fine for a listing, opening the title refreshes them
+        for cache_key, field in ((f"csfd:detail:{hit['id']}", None), (f"csfd:overview:{hit['id']}", 'details')):
+            entry = self.cache.get(cache_key)
+            if entry is None:
+                continue
+            try:
+                details = entry.json()
+            except ValueError:
+                continue
+            if field is not None:
+                details = details.get(field) or {}
+            result.update((key, value) for key, value in details.items() if value)
+            result['partial'] = False
+            break
+        return result
+
+    def _search_detail(self, full_id, type) -> Optional[Dict]:
+        """Fetches details of a single search hit, returning None on failure"""
+        try:
+            details = self.get_detail(full_id)
+        except Exception as e:
+            print(f"Failed to get details for {full_id}: {str(e)}")
+            return None
+        details['id'] = full_id
+        details['type'] = type
+        if self.index is not None:
+            self.index.set_kind(full_id, type)
+        return details
     
     def get_seasons(self, full_id):
         """
@@ -146,14 +420,12 @@ class CSFD:
         :rtype: list
         """
         url = f"{self.base_url}/film/{full_id}/prehled"
-        headers = {
-            "User-Agent": random.choice(self.USER_AGENTS)
-        }
-        response = requests.get(url, headers=headers)
-        if 600 > response.status_code >= 400:
-            raise Exception(f"Failed to get seasons for {full_id}\nStatus code: {response.status_code}\nResponse: {response.text}")
-        
-        soup = BeautifulSoup(response.text.encode('utf-8'), "html.parser")
+        return self._load("seasons", full_id, url, self._parse_seasons, f"get seasons for {full_id}")
+
+    def _parse_seasons(self, content):
+        return self._extract_seasons(self._soup(content, self.EPISODES_TARGETS))
+
+    def _extract_seasons(self, soup):
         
         seasons = []
         episodes_list = soup.find('div', class_='film-episodes-list')
@@ -216,14 +488,15 @@ class CSFD:
         :rtype: list
         """
         url = f"{self.base_url}/film/{full_id}/{season_id}/prehled"
-        headers = {
-            "User-Agent": random.choice(self.USER_AGENTS)
-        }
-        response = requests.get(url, headers=headers)
-        if 600 > response.status_code >= 400:
-            raise Exception(f"Failed to get episodes for {full_id}/{season_id}\nStatus code: {response.status_code}\nResponse: {response.text}")
-        
-        soup = BeautifulSoup(response.text.encode('utf-8'), "html.parser")
+        return self._load(
+            "episodes", f"{full_id}/{season_id}", url, self._parse_episodes,
+            f"get episodes for {full_id}/{season_id}",
+        )
+
+    def _parse_episodes(self, content):
+        return self._extract_episodes(self._soup(content, self.EPISODES_TARGETS))
+
+    def _extract_episodes(self, soup):
         
         episodes = []
         episodes_list = soup.find('div', class_='film-episodes-list')
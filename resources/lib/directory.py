@@ -0,0 +1,98 @@
+import xbmcgui
+import xbmcplugin
+
+# Video info key -> (InfoTagVideo setter, value conversion)
+_TAG_SETTERS = {
+    'title': ('setTitle', str),
+    'originaltitle': ('setOriginalTitle', str),
+    'tvshowtitle': ('setTvShowTitle', str),
+    'year': ('setYear', int),
+    'plot': ('setPlot', str),
+    'rating': ('setRating', float),
+    'genre': ('setGenres', list),
+    'season': ('setSeason', int),
+    'episode': ('setEpisode', int),
+    'mediatype': ('setMediaType', str),
+}
+
+
+def format_size(size) -> str:
+    """Returns a human readable file size, e.g. '1.4 GB'"""
+    size = float(size or 0)
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit in ('B', 'KB') else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _rating(value) -> float:
+    """CSFD ratings come as percentages ('85%'), Kodi expects 0-10"""
+    if isinstance(value, str) and value.strip().endswith('%'):
+        return float(value.strip()[:-1]) / 10
+    return float(value)
+
+
+def set_video_info(item, info):
+    """
+    Sets video info labels on {item} through the InfoTagVideo API, falling
+    back to the deprecated setInfo on Kodi versions without its setters.
+    Empty values and values that cannot be converted are skipped.
+    """
+    info = {key: value for key, value in info.items() if value not in (None, '', [])}
+    if not info:
+        return
+    tag = item.getVideoInfoTag()
+    if not hasattr(tag, 'setTitle'):
+        item.setInfo('video', info)
+        return
+    for key, value in info.items():
+        setter = _TAG_SETTERS.get(key)
+        if setter is None:
+            continue
+        name, convert = setter
+        try:
+            value = _rating(value) if key == 'rating' else convert(value)
+        except (TypeError, ValueError):
+            continue
+        getattr(tag, name)(value)
+
+
+class Directory:
+    """
+    Collects the items of one plugin listing and hands them to Kodi at once.
+
+    Items are created offscreen and submitted with a single
+    addDirectoryItems call in end(), which also sets the content type,
+    sort methods and whether Kodi may cache the listing on disc.
+    """
+
+    def __init__(self, handle, content=None, cache_to_disc: bool = True, sort_methods=()):
+        self.handle = handle
+        self.content = content
+        self.cache_to_disc = cache_to_disc
+        self.sort_methods = sort_methods
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, url, label, is_folder: bool = True, info=None, art=None, properties=None, label2=''):
+        """Adds an item, returning its ListItem for any further changes"""
+        item = xbmcgui.ListItem(label=label, label2=label2, offscreen=True)
+        if info:
+            set_video_info(item, info)
+        if art:
+            item.setArt(art)
+        for key, value in (properties or {}).items():
+            item.setProperty(key, value)
+        self._items.append((url, item, is_folder))
+        return item
+
+    def end(self, succeeded: bool = True):
+        if self._items:
+            xbmcplugin.addDirectoryItems(self.handle, self._items, len(self._items))
+        for method in self.sort_methods:
+            xbmcplugin.addSortMethod(self.handle, method)
+        if self.content:
+            xbmcplugin.setContent(self.handle, self.content)
+        xbmcplugin.endOfDirectory(self.handle, succeeded, cacheToDisc=self.cache_to_disc)
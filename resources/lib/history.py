@@ -0,0 +1,58 @@
+import json
+import os
+import time
+
+
+class History:
+    """
+    Remembers recently browsed series and the last episode opened in each.
+
+    Kept in a small JSON file in the addon profile, most recent series
+    first, so the background service knows which series to keep warm and
+    which episode comes next.
+    """
+
+    def __init__(self, path, keep: int = 20):
+        self._path = path
+        self.keep = keep
+
+    def _load(self):
+        try:
+            with open(self._path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, list) else []
+        except (OSError, ValueError):
+            return []
+
+    def _save(self, data):
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self._path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data[:self.keep], f, ensure_ascii=False)
+        os.replace(tmp_path, self._path)
+
+    def _update(self, csfd_id, **values):
+        data = self._load()
+        entry = next((entry for entry in data if entry.get('id') == csfd_id), None)
+        if entry is None:
+            entry = {'id': csfd_id}
+        else:
+            data.remove(entry)
+        entry.update(values, seen=int(time.time()))
+        data.insert(0, entry)
+        self._save(data)
+
+    def add_series(self, csfd_id, title, original_title=None):
+        """Moves series {csfd_id} to the top of the history"""
+        self._update(csfd_id, title=title, original_title=original_title or '')
+
+    def set_episode(self, csfd_id, season: int, episode: int):
+        """Records that episode {season}x{episode} of {csfd_id} was opened"""
+        self._update(csfd_id, season=int(season), episode=int(episode))
+
+    def series(self, limit=None):
+        """Returns history entries (dicts with id, title, original_title and maybe season/episode), newest first"""
+        data = [entry for entry in self._load() if entry.get('id') and entry.get('title')]
+        return data[:limit] if limit else data
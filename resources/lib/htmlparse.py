@@ -0,0 +1,81 @@
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    # beautifulsoup4 >= 4.13 filters parsing through ElementFilter
+    from bs4.filter import ElementFilter
+except ImportError:
+    ElementFilter = None
+
+try:
+    import lxml  # noqa: F401
+    FAST_FEATURES = "lxml"
+except ImportError:
+    FAST_FEATURES = "html.parser"
+
+
+def _has_class(attrs, classes) -> bool:
+    value = attrs.get('class') or ''
+    if isinstance(value, str):
+        value = value.split()
+    return any(c in classes for c in value)
+
+
+def _make_match(targets):
+    """
+    Builds a (name, attrs) predicate from {targets}, a dict mapping tag names
+    to a set of accepted classes, or to None to accept the tag with any class.
+    """
+    def match(name, attrs=None):
+        if name not in targets:
+            return False
+        classes = targets[name]
+        return classes is None or _has_class(attrs or {}, classes)
+    return match
+
+
+if ElementFilter is not None:
+    class _TargetFilter(ElementFilter):
+        """Keeps only top-level tags accepted by {match} and drops stray strings"""
+
+        def __init__(self, match):
+            super().__init__()
+            self._match = match
+
+        def allow_tag_creation(self, nsprefix, name, attrs):
+            return self._match(name, attrs)
+
+        def allow_string_creation(self, string):
+            return False
+
+
+def _strainer(targets):
+    match = _make_match(targets)
+    if ElementFilter is not None:
+        return _TargetFilter(match)
+    return SoupStrainer(match)
+
+
+def parse_full(content, targets=None):
+    """Reference backend: complete tree built by the pure-Python html.parser"""
+    return BeautifulSoup(content, "html.parser")
+
+
+def parse_fast(content, targets=None):
+    """
+    Fast backend: builds only the elements listed in {targets} (and their
+    descendants), using lxml when it is installed.
+    """
+    if not targets:
+        return BeautifulSoup(content, FAST_FEATURES)
+    return BeautifulSoup(content, FAST_FEATURES, parse_only=_strainer(targets))
+
+
+BACKENDS = {
+    "full": parse_full,
+    "fast": parse_fast,
+}
+
+
+def get_backend(name):
+    """Returns the parse function registered as {name}, falling back to the full parser"""
+    return BACKENDS.get(name, parse_full)
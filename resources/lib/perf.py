@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+
+class Profiler:
+    """
+    Collects timing spans and HTTP counters for a single plugin invocation.
+
+    Disabled by default; every hook is a cheap no-op until `enabled` is set.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        # name -> [count, total seconds]
+        self._spans = {}
+        # host -> [requests, bytes, total seconds]
+        self._hosts = {}
+
+    def reset(self):
+        with self._lock:
+            self.started = time.perf_counter()
+            self._spans.clear()
+            self._hosts.clear()
+
+    @contextmanager
+    def span(self, name):
+        """Times the enclosed block under {name}; nested and concurrent spans are counted separately"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.perf_counter() - start)
+
+    def add_span(self, name, duration):
+        with self._lock:
+            entry = self._spans.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += duration
+
+    def record_request(self, url, size, duration):
+        """Counts one HTTP request to the host of {url} transferring {size} bytes"""
+        if not self.enabled:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            entry = self._hosts.setdefault(host, [0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += size
+            entry[2] += duration
+
+    def summary(self, route):
+        with self._lock:
+            return {
+                'route': route,
+                'time': int(time.time()),
+                'wall_ms': round((time.perf_counter() - self.started) * 1000, 1),
+                'spans': {
+                    name: {'count': count, 'ms': round(total * 1000, 1)}
+                    for name, (count, total) in sorted(self._spans.items())
+                },
+                'http': {
+                    host: {'requests': count, 'bytes': size, 'ms': round(total * 1000, 1)}
+                    for host, (count, size, total) in sorted(self._hosts.items())
+                },
+            }
+
+
+def format_summary(summary) -> str:
+    """Renders a summary as a compact multi-line text for the Kodi log"""
+    lines = [f"perf route={summary['route']} wall={summary['wall_ms']}ms"]
+    for host, entry in summary['http'].items():
+        lines.append(f"  http {host}: {entry['requests']} requests, {entry['bytes']} bytes, {entry['ms']}ms")
+    for name, entry in summary['spans'].items():
+        lines.append(f"  span {name}: {entry['count']}x {entry['ms']}ms")
+    for host, counters in summary.get('policy', {}).items():
+        lines.append(f"  policy {host}: " + ', '.join(f"{name}={value}" for name, value in counters.items()))
+    return '\n'.join(lines)
+
+
+def write_profile(path, summary, keep: int = 50):
+    """Appends {summary} to the rolling JSON profile at {path}, keeping the last {keep} invocations"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+        if not isinstance(history, list):
+            history = []
+    except (OSError, ValueError):
+        history = []
+    history.append(summary)
+    history = history[-keep:]
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+_profiler = Profiler()
+
+
+def get_profiler():
+    """Returns the profiler of the current plugin invocation"""
+    return _profiler
+
+
+def span(name):
+    """Shortcut for get_profiler().span({name})"""
+    return _profiler.span(name)
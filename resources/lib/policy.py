@@ -0,0 +1,257 @@
+import email.utils
+import random
+import threading
+import time
+
+# Per-host limits: sustained requests per second and burst size. Hosts not
+# listed are not rate limited but still get retries and a circuit breaker.
+HOST_RATES = {
+    'www.csfd.cz': (4.0, 8),
+    'webshare.cz': (8.0, 16),
+}
+
+# Status codes worth retrying; 429 and 503 may carry Retry-After
+RETRY_STATUSES = {429, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+
+
+class ServiceUnavailable(Exception):
+    """Raised when a host keeps failing after all retries"""
+
+
+class CircuitOpenError(ServiceUnavailable):
+    """Raised without sending anything while the circuit of a host is open"""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket with adaptive rate.
+
+    Throttling responses halve the rate (down to {min_rate}), each success
+    restores a little of it again, so a host that starts returning 429s is
+    backed off automatically.
+    """
+
+    def __init__(self, rate: float, burst: int, min_rate: float = 0.5):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Takes one token, sleeping until one is available; returns the seconds waited"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def slow_down(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def speed_up(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a host after {threshold} consecutive failures.
+
+    While open every call fails fast; after {reset_after} seconds a single
+    trial call is let through (half-open) and its outcome closes or reopens
+    the circuit. The circuit counts as open while that trial is in flight.
+    """
+
+    def __init__(self, threshold: int = 5, reset_after: float = 30.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if self._trial or time.monotonic() - self.opened_at < self.reset_after:
+            return 'open'
+        return 'half-open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_after or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def release(self):
+        """Ends a trial call without an outcome, letting the next call try again"""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self) -> bool:
+        """Counts a failure, returns True if this opened the circuit"""
+        with self._lock:
+            self.failures += 1
+            reopened = self._trial
+            self._trial = False
+            if reopened or (self.opened_at is None and self.failures >= self.threshold):
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+
+def retry_after(value):
+    """Parses a Retry-After header (seconds or HTTP date) into seconds, None if invalid"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestPolicy:
+    """
+    Rate limits, retries and circuit breakers for outbound requests, per host.
+
+    send() wraps a single request: it waits for the host's token bucket,
+    retries connection errors and RETRY_STATUSES with jittered exponential
+    backoff (honouring Retry-After), and trips the host's circuit breaker
+    after repeated failures. counters() returns what happened so far.
+    """
+
+    COUNTER_NAMES = ('requests', 'retries', 'throttled', 'failures', 'rejected', 'circuit_opened', 'wait_ms')
+
+    def __init__(self, host_rates=None, max_retries: int = 3, backoff: float = 0.5, max_backoff: float = 10.0,
+                 failure_threshold: int = 5, reset_after: float = 30.0):
+        self.host_rates = HOST_RATES if host_rates is None else host_rates
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                rate = self.host_rates.get(host)
+                state = self._hosts[host] = {
+                    'bucket': TokenBucket(*rate) if rate else None,
+                    'breaker': CircuitBreaker(self.failure_threshold, self.reset_after),
+                    'counters': dict.fromkeys(self.COUNTER_NAMES, 0),
+                }
+            return state
+
+    def _count(self, state, name, amount=1):
+        with self._lock:
+            state['counters'][name] += amount
+
+    def is_open(self, host) -> bool:
+        """True while calls to {host} are being rejected"""
+        return self._host(host)['breaker'].state == 'open'
+
+    def delay(self, attempt, response=None) -> float:
+        """Seconds to wait before retry {attempt} (1-based)"""
+        if response is not None and response.status_code in THROTTLE_STATUSES:
+            after = retry_after(response.headers.get('Retry-After'))
+            if after is not None:
+                return min(after, self.max_backoff)
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    def send(self, host, request, retry_on=(Exception,)):
+        """
+        Runs {request}() (returning a response with status_code and headers)
+        under the policy of {host}. Raises CircuitOpenError while the host is
+        down and ServiceUnavailable once retries of an exception in {retry_on}
+        run out; a retryable status is returned as the last response.
+        """
+        state = self._host(host)
+        bucket = state['bucket']
+        breaker = state['breaker']
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                self._count(state, 'rejected')
+                raise CircuitOpenError(f"{host} is unavailable, retrying in {self.reset_after:.0f}s")
+            if bucket is not None:
+                waited = bucket.acquire()
+                if waited:
+                    self._count(state, 'wait_ms', round(waited * 1000))
+            self._count(state, 'requests')
+
+            try:
+                response = request()
+            except retry_on as e:
+                error, response = e, None
+            except BaseException:
+                # Not a sign of the host being down, but a trial call must not stay in flight
+                breaker.release()
+                raise
+            else:
+                error = None
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.record_success()
+                    if bucket is not None:
+                        bucket.speed_up()
+                    return response
+                if response.status_code in THROTTLE_STATUSES:
+                    self._count(state, 'throttled')
+                    if bucket is not None:
+                        bucket.slow_down()
+
+            self._count(state, 'failures')
+            if breaker.record_failure():
+                self._count(state, 'circuit_opened')
+            attempt += 1
+            if attempt > self.max_retries or breaker.state == 'open':
+                if error is not None:
+                    raise ServiceUnavailable(f"Request to {host} failed: {error}") from error
+                return response
+            self._count(state, 'retries')
+            time.sleep(self.delay(attempt, response))
+            if response is not None:
+                response.close()
+
+    def counters(self):
+        """Returns {host: {counter: value}} plus the circuit state of every host seen"""
+        with self._lock:
+            hosts = list(self._hosts.items())
+        return {
+            host: dict(state['counters'], circuit=state['breaker'].state)
+            for host, state in sorted(hosts)
+        }
+
+
+_policy = RequestPolicy()
+
+
+def get_policy():
+    """Returns the process-wide request policy"""
+    return _policy
@@ -0,0 +1,136 @@
+import re
+import unicodedata
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_YEAR_RE = re.compile(r'(?<!\d)(19\d\d|20\d\d)(?!\d)')
+_EPISODE_RE = re.compile(r'(?<![a-z0-9])s(\d{1,2})[ ._-]?e(\d{1,3})(?!\d)|(?<!\d)(\d{1,2})x(\d{2,3})(?!\d)')
+
+# (pattern, score) pairs matched against the diacritic-folded file name
+QUALITY_TAGS = [
+    (re.compile(r'(?<![a-z0-9])(2160p|4k|uhd)(?![a-z0-9])'), 3.0),
+    (re.compile(r'(?<![a-z0-9])1080[pi](?![a-z0-9])'), 4.0),
+    (re.compile(r'(?<![a-z0-9])720p(?![a-z0-9])'), 2.0),
+    (re.compile(r'(?<![a-z0-9])(bluray|blu ray|bdrip|brrip|web ?dl|webrip)(?![a-z0-9])'), 1.0),
+    (re.compile(r'(?<![a-z0-9])(cam|camrip|hdcam|ts|telesync|hdts)(?![a-z0-9])'), -8.0),
+    (re.compile(r'(?<![a-z0-9])(cz|cesky|czech)[ ._-]?(dab|dabing|dub|audio)|(?<![a-z0-9])dabing(?![a-z0-9])'), 6.0),
+    (re.compile(r'(?<![a-z0-9])(cz|cze|cesky)[ ._-]?(tit|titulky|sub|subs)(?![a-z0-9])|(?<![a-z0-9])titulky(?![a-z0-9])'), 3.0),
+    (re.compile(r'(?<![a-z0-9])(sk|slovensky)[ ._-]?(dab|dabing|dub)(?![a-z0-9])'), 2.0),
+]
+
+MB = 1024 * 1024
+# Plausible file size ranges (bytes) for a full movie and a single episode
+MOVIE_SIZE = (600 * MB, 30 * 1024 * MB)
+EPISODE_SIZE = (100 * MB, 8 * 1024 * MB)
+# Anything smaller is a sample, trailer or broken upload
+TOO_SMALL = 50 * MB
+
+
+def fold(text) -> str:
+    """Lower-cases {text} and strips diacritics ("Pelíšky" -> "pelisky")"""
+    decomposed = unicodedata.normalize('NFKD', str(text or ''))
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    """Returns the alphanumeric tokens of the folded {text}"""
+    return _TOKEN_RE.findall(fold(text))
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Ranker:
+    """
+    Scores Webshare files by how well their name matches CSFD metadata.
+
+    Everything derived from the metadata (title token sets, phrase patterns,
+    year, episode) is prepared once in the constructor, so scoring a file is
+    a handful of set operations and precompiled regex searches.
+    """
+
+    def __init__(self, title=None, original_title=None, year=None, season=None, episode=None):
+        self._titles = []
+        for candidate in (title, original_title):
+            words = tokenize(candidate)
+            if words and all(words != known for known, _ in self._titles):
+                phrase = re.compile(r'(?<![a-z0-9])' + r'[^a-z0-9]+'.join(map(re.escape, words)) + r'(?![a-z0-9])')
+                self._titles.append((words, phrase))
+        self._year = _to_int(year)
+        self._season = _to_int(season)
+        self._episode = _to_int(episode)
+
+    @property
+    def is_episode(self) -> bool:
+        return self._season is not None and self._episode is not None
+
+    def _episode_match(self, folded):
+        """True if the folded name carries the wanted SxxEyy, False if only others, None if none"""
+        found = None
+        for m in _EPISODE_RE.finditer(folded):
+            season = int(m.group(1) or m.group(3))
+            episode = int(m.group(2) or m.group(4))
+            if season == self._season and episode == self._episode:
+                return True
+            found = False
+        return found
+
+    def matches_episode(self, name) -> bool:
+        """True if file {name} is marked as the ranked episode (SxxEyy or NxEE)"""
+        return self.is_episode and bool(self._episode_match(fold(name)))
+
+    def score(self, name, size=0, queries=()) -> float:
+        folded = fold(name)
+        name_tokens = set(_TOKEN_RE.findall(folded))
+        score = 0.0
+
+        # Title – share of title words present, bonus for the exact phrase
+        best = 0.0
+        for words, phrase in self._titles:
+            match = sum(1 for w in words if w in name_tokens) / len(words)
+            if match == 1.0 and phrase.search(folded):
+                match += 0.3
+            best = max(best, match)
+        score += 10.0 * best
+
+        # Year
+        if self._year is not None:
+            years = {int(y) for y in _YEAR_RE.findall(folded)}
+            if self._year in years:
+                score += 3.0
+            elif years and not self.is_episode:
+                score -= 3.0
+
+        # Episode number
+        if self.is_episode:
+            matched = self._episode_match(folded)
+            score += 10.0 if matched else (-10.0 if matched is False else -2.0)
+
+        # Quality and language tags
+        for pattern, tag_score in QUALITY_TAGS:
+            if pattern.search(folded):
+                score += tag_score
+
+        # Size plausibility
+        size = size or 0
+        low, high = EPISODE_SIZE if self.is_episode else MOVIE_SIZE
+        if 0 < size < TOO_SMALL:
+            score -= 8.0
+        elif size and not low <= size <= high:
+            score -= 3.0
+
+        # Found by more than one query (e.g. localized and original title)
+        score += 1.0 * max(0, len(queries) - 1)
+        return score
+
+    def rank(self, files):
+        """Returns WebshareFile records sorted by score, best first (ties keep their order)"""
+        scored = [
+            (self.score(f.name, f.size, f.queries) + 0.01 * max(-10, min(10, f.rating)), i, f)
+            for i, f in enumerate(files)
+        ]
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return [f for _, _, f in scored]
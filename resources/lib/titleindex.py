@@ -0,0 +1,148 @@
+import json
+import os
+import sqlite3
+import threading
+
+from resources.lib.ranking import fold, tokenize
+
+# Fields of CSFD detail dicts kept so local hits can be listed without a request
+PAYLOAD_FIELDS = ('title', 'original_title', 'year', 'rating', 'genres', 'plot', 'poster')
+
+
+class TitleIndex:
+    """
+    Local full-text index of CSFD titles seen while browsing.
+
+    Filled from CSFD detail, season and episode results and queried with
+    diacritic-insensitive prefix matching ("pel" finds "Pelíšky"). Uses an
+    SQLite FTS5 (or FTS4) table when the SQLite build has one and a plain
+    LIKE scan otherwise.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS titles ('
+                ' csfd_id TEXT PRIMARY KEY, kind TEXT, parent TEXT, folded TEXT NOT NULL, payload TEXT NOT NULL)'
+            )
+            self._fts = self._create_fts()
+
+    def _create_fts(self):
+        """Creates the full-text table, returning its module name or None if unsupported"""
+        for module in ('fts5', 'fts4'):
+            try:
+                self._conn.execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS titles_fts USING {module}(folded, csfd_id UNINDEXED)'
+                                   if module == 'fts5' else
+                                   f'CREATE VIRTUAL TABLE IF NOT EXISTS titles_fts USING {module}(folded, csfd_id, notindexed=csfd_id)')
+                return module
+            except sqlite3.OperationalError:
+                continue
+        return None
+
+    def add(self, csfd_id, details, kind=None, parent=None):
+        """
+        Indexes (or updates) a title. {kind} is 'movie', 'series', 'season' or
+        'episode'; None keeps the kind already known for {csfd_id}.
+        """
+        self.add_many([(csfd_id, details, kind, parent)])
+
+    def add_many(self, titles):
+        """Indexes (csfd_id, details, kind, parent) tuples in a single transaction"""
+        rows = []
+        for csfd_id, details, kind, parent in titles:
+            if not csfd_id or not details or not details.get('title'):
+                continue
+            payload = {field: details.get(field) for field in PAYLOAD_FIELDS if details.get(field) is not None}
+            folded = ' '.join(filter(None, (
+                fold(details.get('title')), fold(details.get('original_title')), str(details.get('year') or ''),
+            )))
+            rows.append((csfd_id, kind, parent, folded, json.dumps(payload, ensure_ascii=False)))
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                for csfd_id, kind, parent, folded, payload in rows:
+                    known = self._conn.execute('SELECT kind, parent FROM titles WHERE csfd_id = ?', (csfd_id,)).fetchone()
+                    if known is not None:
+                        kind = kind or known[0]
+                        parent = parent or known[1]
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO titles (csfd_id, kind, parent, folded, payload) VALUES (?, ?, ?, ?, ?)',
+                        (csfd_id, kind, parent, folded, payload),
+                    )
+                    if self._fts:
+                        self._conn.execute('DELETE FROM titles_fts WHERE csfd_id = ?', (csfd_id,))
+                        self._conn.execute('INSERT INTO titles_fts (folded, csfd_id) VALUES (?, ?)', (folded, csfd_id))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def add_seasons(self, series_id, seasons):
+        self.set_kind(series_id, 'series')
+        self.add_many(
+            (f"{series_id}/{season['id']}", season, 'season', series_id) for season in seasons if season.get('id')
+        )
+
+    def add_episodes(self, series_id, episodes):
+        self.add_many(
+            (f"{series_id}/{episode['id']}", episode, 'episode', series_id) for episode in episodes if episode.get('id')
+        )
+
+    def set_kind(self, csfd_id, kind):
+        with self._lock:
+            self._conn.execute('UPDATE titles SET kind = ? WHERE csfd_id = ?', (kind, csfd_id))
+
+    def search(self, query, kind, limit: int = 30):
+        """
+        Returns detail dicts (with 'id' and 'type') of indexed titles of {kind}
+        matching every word of {query} as a prefix. Matching seasons and
+        episodes of a series count as a hit for the series.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        with self._lock:
+            if self._fts:
+                match = ' '.join(f'{word}*' for word in words)
+                rows = self._conn.execute(
+                    'SELECT t.csfd_id, t.kind, t.parent, t.payload FROM titles_fts f JOIN titles t ON t.csfd_id = f.csfd_id '
+                    'WHERE titles_fts MATCH ? LIMIT ?', (match, limit * 4),
+                ).fetchall()
+            else:
+                clauses = ' AND '.join("(' ' || folded) LIKE ?" for _ in words)
+                rows = self._conn.execute(
+                    f'SELECT csfd_id, kind, parent, payload FROM titles WHERE {clauses} LIMIT ?',
+                    [f'% {word}%' for word in words] + [limit * 4],
+                ).fetchall()
+
+            results = []
+            seen = set()
+            for csfd_id, row_kind, parent, payload in rows:
+                if row_kind in ('season', 'episode') and kind == 'series' and parent:
+                    parent_row = self._conn.execute(
+                        'SELECT csfd_id, kind, payload FROM titles WHERE csfd_id = ?', (parent,)
+                    ).fetchone()
+                    if parent_row is None:
+                        continue
+                    csfd_id, row_kind, payload = parent_row
+                if row_kind != kind or csfd_id in seen:
+                    continue
+                seen.add(csfd_id)
+                details = json.loads(payload)
+                details.update({'id': csfd_id, 'type': kind})
+                results.append(details)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
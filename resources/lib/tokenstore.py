@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import time
+
+
+class TokenStore:
+    """
+    Persists Webshare session tokens between plugin invocations.
+
+    Tokens are kept in a small JSON file (normally in the addon profile
+    directory) keyed by username, so a fresh interpreter can reuse the
+    token instead of doing salt/ + login/ again.
+
+    The salted password digest sent to login/ is stored next to the token
+    together with a fingerprint of the password it was derived from, so a
+    re-login needs a single request and a changed password is detected
+    without keeping the password itself. The file is readable by the owner only.
+    """
+
+    def __init__(self, path):
+        self._path = path
+
+    def _load(self):
+        try:
+            with open(self._path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, data):
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self._path + '.tmp'
+        # Created owner-only, the login digest must never be readable by others, not even briefly
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self._path)
+
+    def get(self, user_name) -> str:
+        """Returns the stored token for {user_name} or an empty string"""
+        entry = self._load().get(user_name) or {}
+        return entry.get('token', '')
+
+    def set(self, user_name, token):
+        """Stores {token} for {user_name}"""
+        data = self._load()
+        entry = data.setdefault(user_name, {})
+        entry.update({'token': token, 'updated': int(time.time())})
+        self._save(data)
+
+    @staticmethod
+    def _fingerprint(user_name, password) -> str:
+        return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), user_name.encode('utf-8'), 2000).hex()
+
+    def get_digest(self, user_name, password) -> str:
+        """
+        Returns the password digest stored for {user_name}, or an empty string
+        if there is none or it was derived from a different password
+        """
+        entry = self._load().get(user_name) or {}
+        if not entry.get('digest') or entry.get('fingerprint') != self._fingerprint(user_name, password):
+            return ''
+        return entry['digest']
+
+    def set_digest(self, user_name, password, digest):
+        """Stores the login {digest} derived from {password} for {user_name}"""
+        data = self._load()
+        entry = data.setdefault(user_name, {})
+        entry.update({'digest': digest, 'fingerprint': self._fingerprint(user_name, password)})
+        self._save(data)
+
+    def clear_digest(self, user_name):
+        """Forgets the password digest of {user_name} after Webshare rejected it"""
+        data = self._load()
+        entry = data.get(user_name) or {}
+        if entry.pop('digest', None) is not None:
+            entry.pop('fingerprint', None)
+            self._save(data)
+
+    def invalidate(self, user_name):
+        """Forgets the token stored for {user_name}, keeping its password digest"""
+        data = self._load()
+        entry = data.get(user_name) or {}
+        if entry.pop('token', None) is not None:
+            self._save(data)
+
+
+def authenticate(api, store, user_name, password, force_login: bool = False):
+    """
+    Gives {api} a Webshare session token for {user_name}.
+
+    The token kept in {store} is reused unless {force_login} is set, in
+    which case it was rejected and is forgotten before logging in again. A
+    new login uses the stored password digest when it is still valid, so it
+    takes a single login/ request; a digest Webshare rejects is forgotten.
+    """
+    api.account = user_name
+    if force_login:
+        store.invalidate(user_name)
+    token = store.get(user_name)
+    if token:
+        api.set_token(token)
+        return
+
+    digest = store.get_digest(user_name, password)
+    new_digest = api.login(user_name, password, digest, on_digest_rejected=lambda: store.clear_digest(user_name))
+    if not getattr(api, "_token", ""):
+        raise RuntimeError("Webshare returned an empty token – check credentials.")
+    store.set(user_name, api._token)
+    if new_digest != digest:
+        store.set_digest(user_name, password, new_digest)
@@ -0,0 +1,98 @@
+import threading
+import time
+from functools import partial
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from resources.lib import perf
+from resources.lib.policy import get_policy
+
+# (connect, read) timeout in seconds used when a call does not pass its own
+DEFAULT_TIMEOUT = (5, 20)
+
+DEFAULT_HEADERS = {
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+# Maximum number of pooled keep-alive connections per host
+HOST_POOL_LIMITS = {
+    'https://webshare.cz/': 4,
+    'https://www.csfd.cz/': 8,
+}
+DEFAULT_POOL_LIMIT = 4
+
+
+class Session(requests.Session):
+    """
+    requests.Session shared by all API clients.
+
+    Keeps connections alive per host with a bounded pool, asks for gzip
+    encoded responses and applies a default timeout so a hung server cannot
+    freeze Kodi. Every request goes through the shared RequestPolicy (rate
+    limits, retries, circuit breakers, see resources.lib.policy).
+    """
+
+    # Exceptions the policy retries and counts against a host
+    RETRY_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, pool_limits=None, policy=None):
+        super().__init__()
+        self.timeout = timeout
+        self.policy = policy or get_policy()
+        # Number of requests sent so far, e.g. for request budgets
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self.headers.update(DEFAULT_HEADERS)
+        default_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=DEFAULT_POOL_LIMIT)
+        self.mount('https://', default_adapter)
+        self.mount('http://', default_adapter)
+        limits = HOST_POOL_LIMITS if pool_limits is None else pool_limits
+        for prefix, limit in limits.items():
+            # pool_block makes extra threads wait for a free connection instead
+            # of opening more than {limit} connections to the host
+            self.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=limit, pool_block=True))
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        with self._count_lock:
+            self.request_count += 1
+        send = partial(self.policy.send, urlsplit(url).hostname or '',
+                       partial(super().request, method, url, **kwargs), retry_on=self.RETRY_ERRORS)
+        profiler = perf.get_profiler()
+        if not profiler.enabled:
+            return send()
+
+        start = time.perf_counter()
+        response = send()
+        # Bytes on the wire when known, streamed bodies are not read here
+        size = response.headers.get('Content-Length')
+        if size is None and not kwargs.get('stream'):
+            size = len(response.content)
+        profiler.record_request(url, int(size or 0), time.perf_counter() - start)
+        return response
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Returns the process-wide session, creating it on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = Session()
+        return _session
+
+
+def set_session(session):
+    """
+    Replaces the process-wide session, e.g. with a local stand-in for tests.
+    Passing None drops the current session so the next call creates a new one.
+    """
+    global _session
+    with _session_lock:
+        _session = session
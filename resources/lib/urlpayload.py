@@ -0,0 +1,79 @@
+import base64
+import json
+import zlib
+
+# Payload format version, the first character of every encoded payload
+VERSION = '1'
+
+# Short keys used on the wire, unknown keys are kept as they are
+SHORT_KEYS = {
+    'queries': 'q',
+    'title': 't',
+    'original_title': 'o',
+    'year': 'y',
+    'season': 's',
+    'episode': 'e',
+    'csfd_id': 'c',
+    'poster': 'i',
+    'plot': 'p',
+    'rating': 'r',
+    'genres': 'g',
+    'partial': 'f',
+}
+LONG_KEYS = {short: key for key, short in SHORT_KEYS.items()}
+
+# Kodi keeps plugin URLs in favourites, history and its database; keep them short
+MAX_LENGTH = 1500
+# Fields dropped, in this order, when a payload does not fit into MAX_LENGTH
+OPTIONAL_FIELDS = ('plot', 'genres', 'poster', 'rating')
+
+
+class PayloadError(ValueError):
+    """Raised for payloads which cannot be encoded within MAX_LENGTH or decoded"""
+
+
+def _pack(data) -> str:
+    raw = json.dumps(
+        {SHORT_KEYS.get(key, key): value for key, value in data.items() if value not in (None, '', [])},
+        ensure_ascii=False, separators=(',', ':'),
+    ).encode('utf-8')
+    # 'z' marks a zlib compressed body, 'j' plain JSON; short payloads do not shrink
+    compressed = zlib.compress(raw, 9)
+    flag, body = ('z', compressed) if len(compressed) < len(raw) else ('j', raw)
+    return VERSION + flag + base64.urlsafe_b64encode(body).decode('ascii').rstrip('=')
+
+
+def encode(data, max_length: int = MAX_LENGTH) -> str:
+    """
+    Encodes the dict {data} into a compact URL-safe string.
+
+    Empty values are left out. If the result is longer than {max_length},
+    OPTIONAL_FIELDS are dropped one by one; PayloadError is raised when it
+    still does not fit.
+    """
+    data = dict(data)
+    payload = _pack(data)
+    for field in OPTIONAL_FIELDS:
+        if len(payload) <= max_length:
+            break
+        if data.pop(field, None) is not None:
+            payload = _pack(data)
+    if len(payload) > max_length:
+        raise PayloadError(f"Payload of {len(payload)} characters exceeds {max_length}")
+    return payload
+
+
+def decode(payload) -> dict:
+    """Decodes a string created by encode(), raising PayloadError if it is invalid"""
+    if not payload or payload[0] != VERSION or payload[1:2] not in ('z', 'j'):
+        raise PayloadError(f"Unsupported payload: {payload[:10]!r}")
+    try:
+        body = base64.urlsafe_b64decode(payload[2:] + '=' * (-len(payload[2:]) % 4))
+        if payload[1] == 'z':
+            body = zlib.decompress(body)
+        data = json.loads(body.decode('utf-8'))
+    except (ValueError, zlib.error) as e:
+        raise PayloadError(f"Corrupted payload: {str(e)}") from e
+    if not isinstance(data, dict):
+        raise PayloadError("Payload is not a mapping")
+    return {LONG_KEYS.get(key, key): value for key, value in data.items()}
@@ -0,0 +1,132 @@
+from typing import Dict, List, Optional
+
+from resources.lib.ranking import Ranker
+from resources.lib.transport import get_session
+
+# Home window property through which the play route tells the service which episode plays
+PLAYING_PROPERTY = "kodisimplestream.playing"
+
+
+def episode_queries(series_title, original_title, season: int, episode: int) -> List[str]:
+    """Returns the Webshare search terms for one episode of a series"""
+    queries = [f"{series_title} S{season:02d}E{episode:02d}"]
+    if original_title and original_title != series_title:
+        queries.append(f"{original_title} S{season:02d}E{episode:02d}")
+    return queries
+
+
+class Warmer:
+    """
+    Fetches ahead what the plugin is likely to need on the next click.
+
+    Keeps the Webshare token valid, refreshes the CSFD overview and current
+    season of recently browsed series and runs the Webshare searches for
+    the episode following the last one opened. Everything goes through the
+    regular caches, and the work stops once {budget} HTTP requests were sent.
+    """
+
+    def __init__(self, api, csfd, history, budget: int = 40, series_limit: int = 5, page_size: int = 30,
+                 login=None, session=None):
+        self.api = api
+        self.csfd = csfd
+        self.history = history
+        self.budget = budget
+        self.series_limit = series_limit
+        # Must match the page size of the plugin's search listing to hit the same cache entries
+        self.page_size = page_size
+        # Optional callable login(force_login) giving the api a token
+        self.login = login
+        self._session = session or get_session()
+        self._start = self._session.request_count
+
+    @property
+    def used(self) -> int:
+        return self._session.request_count - self._start
+
+    @property
+    def remaining(self) -> int:
+        return self.budget - self.used
+
+    def run(self, should_stop=None) -> int:
+        """Warms everything it can within the budget, returns the number of requests used"""
+        self._start = self._session.request_count
+        if self.login is not None:
+            try:
+                self.refresh_token()
+            except Exception as e:
+                print(f"Token refresh failed: {str(e)}")
+
+        for entry in self.history.series(self.series_limit):
+            if self.remaining <= 0 or (should_stop is not None and should_stop()):
+                break
+            try:
+                self.warm_series(entry)
+            except Exception as e:
+                print(f"Warming {entry['id']} failed: {str(e)}")
+        self.csfd.wait_for_revalidations()
+        return self.used
+
+    def refresh_token(self):
+        """Logs in again if Webshare no longer accepts the stored token"""
+        self.login(False)
+        if not self.api.is_token_valid():
+            self.login(True)
+
+    def warm_series(self, entry):
+        overview = self.csfd.get_overview(entry['id'])
+        if entry.get('episode') is None or self.remaining <= 0:
+            return
+        episode = self.next_episode(entry['id'], overview, entry.get('season') or 0, entry['episode'])
+        if episode is None:
+            return
+        queries = episode_queries(
+            entry['title'], entry.get('original_title'), episode.get('season') or 0, episode.get('number') or 0,
+        )
+        if self.remaining >= len(queries):
+            self.api.search_many(queries, limit=self.page_size)
+
+    def next_episode(self, csfd_id, overview, season: int, episode: int) -> Optional[Dict]:
+        """Returns the episode following {season}x{episode}, loading season listings as needed"""
+        def after(episodes, listed_season):
+            return next((ep for ep in episodes
+                         if ((ep.get('season') or listed_season), ep.get('number') or 0) > (season, episode)), None)
+
+        if overview['episodes']:
+            return after(overview['episodes'], season)
+        for season_info in sorted(overview['seasons'], key=lambda s: s['number']):
+            if season_info['number'] < season or self.remaining <= 0:
+                continue
+            found = after(self.csfd.get_episodes(csfd_id, season_info['id']), season_info['number'])
+            if found is not None:
+                return found
+        return None
+
+    def prepare_next(self, playing) -> Optional[Dict]:
+        """
+        Prepares the episode following {playing}, a dict with csfd_id, title,
+        original_title, season and episode: runs its Webshare searches and
+        resolves the link of the best ranked file, which the plugin's play
+        route then finds in the cache. Returns the episode's meta with the
+        file's ident and name, or None when there is nothing to play.
+        """
+        if self.login is not None:
+            self.login(False)
+        csfd_id = playing['csfd_id']
+        season = int(playing.get('season') or 0)
+        episode = self.next_episode(csfd_id, self.csfd.get_overview(csfd_id), season, int(playing['episode']))
+        if episode is None or episode.get('number') is None:
+            return None
+        meta = {
+            'csfd_id': csfd_id,
+            'title': playing['title'],
+            'original_title': playing.get('original_title') or '',
+            'season': episode.get('season') or season,
+            'episode': episode['number'],
+        }
+        queries = episode_queries(meta['title'], meta['original_title'], meta['season'], meta['episode'])
+        # Same page size and ranking as the plugin's listing, so both agree on the best file
+        files, _ = self.api.search_many(queries, limit=self.page_size)
+        files = Ranker(meta['title'], meta['original_title'], season=meta['season'], episode=meta['episode']).rank(files)
+        if not files or not self.api.get_download_link(files[0].ident):
+            return None
+        return {**meta, 'ident': files[0].ident, 'name': files[0].name}
@@ -1,10 +1,86 @@
-import requests
 import hashlib
-import xmltodict
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from xml.etree import ElementTree
 import json
 
+from resources.lib import perf
 from resources.lib.md5crypt import md5crypt
+from resources.lib.transport import get_session
+
+
+class WebshareError(Exception):
+    """Raised when Webshare API answers with an error"""
+
+
+def _check_status(root):
+    """Raises WebshareError unless the API response {root} reports status OK"""
+    if root.find('status') is None or root.find('status').text != 'OK':
+        raise WebshareError('Return code was not OK, debug info: status: {}, code: {}, message: {}'.format(
+            root.findtext('status'),
+            root.findtext('code'),
+            root.findtext('message')))
+
+
+def _parse_response(response):
+    """Parses the XML body of an API {response}, raising WebshareError on HTTP errors"""
+    if response.status_code != 200:
+        raise WebshareError(f"Request to {response.url} failed with status code: {response.status_code}")
+    return ElementTree.fromstring(response.content)
+
+class WebshareFile:
+    """
+    Lightweight record of a single file returned by Webshare search
+    """
+    FIELDS = ('ident', 'name', 'type', 'size', 'img', 'stripe', 'stripe_count',
+              'positive_votes', 'negative_votes', 'password')
+    # queries: search queries that returned this file (provenance after merging)
+    __slots__ = FIELDS + ('queries',)
+
+    _INT_FIELDS = ('size', 'stripe_count', 'positive_votes', 'negative_votes', 'password')
+
+    def __init__(self, ident, name='', type='', size=0, img='', stripe='', stripe_count=0,
+                 positive_votes=0, negative_votes=0, password=0):
+        self.ident = ident
+        self.name = name
+        self.type = type
+        self.size = size
+        self.img = img
+        self.stripe = stripe
+        self.stripe_count = stripe_count
+        self.positive_votes = positive_votes
+        self.negative_votes = negative_votes
+        self.password = password
+        self.queries = []
+
+    @property
+    def rating(self) -> int:
+        return self.positive_votes - self.negative_votes
+
+    @classmethod
+    def from_element(cls, elem):
+        """Creates the record from a <file> element of the search response"""
+        values = {}
+        for child in elem:
+            if child.tag in cls.FIELDS:
+                values[child.tag] = child.text or ''
+        for field in cls._INT_FIELDS:
+            try:
+                values[field] = int(values.get(field) or 0)
+            except ValueError:
+                values[field] = 0
+        return cls(**values)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{k: v for k, v in data.items() if k in cls.FIELDS})
+
+    def __repr__(self):
+        return f"WebshareFile({self.ident!r}, {self.name!r})"
 
 class WebshareAPI:
     """
@@ -12,83 +88,241 @@ class WebshareAPI:
     https://webshare.cz/apidoc/
     """
     
-    def __init__(self):
+    # Lifetime of cached search pages, in seconds
+    SEARCH_TTL = 15 * 60
+    # Lifetime of cached file links; Webshare links last several hours, stay well below that
+    LINK_TTL = 2 * 60 * 60
+    # Cached links younger than this are used without checking them first
+    LINK_TRUSTED_FOR = 10 * 60
+
+    def __init__(self, session=None, cache=None):
+        self._session = session or get_session()
+        # Optional resources.lib.cache.Cache for search pages
+        self.cache = cache
+        self._prefetches = []
         self._base_url = "https://webshare.cz/api/"
         self._headers = {'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'}
         self._token = ""
+        # Name of the logged in account, keeps cached links of different accounts apart
+        self.account = ""
+
+    def login(self, user_name, password, password_digest=None, on_digest_rejected=None):
+        """Logs {user_name} in Webshare API
+        With {password_digest} returned by an earlier login, the salt/ round trip
+        and password hashing are skipped; if Webshare rejects the digest,
+        {on_digest_rejected}() is called and a full login follows. Returns the
+        password digest of the successful login.
+        """
+        with perf.span("webshare.login"):
+            return self._login(user_name, password, password_digest, on_digest_rejected)
+
+    def _login(self, user_name, password, password_digest=None, on_digest_rejected=None):
+        if password_digest:
+            root = self._post_login(user_name, password_digest)
+            if root.findtext('status') == 'OK':
+                self._token = root.findtext('token', '')
+                return password_digest
+            if on_digest_rejected is not None:
+                on_digest_rejected()
 
-    def login(self, user_name, password):
-        """Logs {user_name} in Webshare API"""
         salt = self.get_salt(user_name)
+        password_digest = self.hash_password(password, salt)
+        root = self._post_login(user_name, password_digest)
+        _check_status(root)
+        self._token = root.find('token').text
+        return password_digest
+
+    def _post_login(self, user_name, password_digest):
         url = self._base_url + 'login/'
-        password = self.hash_password(password, salt)
         data = {
                 'username_or_email' : user_name,
-                'password' : password,
+                'password' : password_digest,
                 'keep_logged_in' : 1
                 }
-        response = requests.post(url, data=data, headers=self._headers)
-        assert(response.status_code == 200)
+        response = self._session.post(url, data=data, headers=self._headers)
+        return _parse_response(response)
+
+    def set_token(self, token):
+        """Reuses a previously obtained session {token} instead of logging in"""
+        self._token = token or ""
+
+    def is_token_valid(self) -> bool:
+        """Checks whether the current session token is still accepted by Webshare API"""
+        if not self._token:
+            return False
+        url = self._base_url + 'user_data/'
+        data = {'wst' : self._token}
+        with perf.span("webshare.user_data"):
+            response = self._session.post(url, data=data, headers=self._headers)
+        if response.status_code != 200:
+            return False
         root = ElementTree.fromstring(response.content)
-        assert root.find('status').text == 'OK', 'Return code was not OK, debug info: status: {}, code: {}, message: {}'.format(
-                    root.find('status').text,
-                    root.find('code').text,
-                    root.find('message').text)
-        self._token = root.find('token').text
+        status = root.find('status')
+        return status is not None and status.text == 'OK'
 
     def hash_password(self, password, salt):
         """Creates password hash used by Webshare API"""
-        return hashlib.sha1(md5crypt(password, salt).encode('utf-8')).hexdigest()
+        with perf.span("webshare.hash_password"):
+            return hashlib.sha1(md5crypt(password, salt).encode('utf-8')).hexdigest()
 
     def get_salt(self, user_name):
         """Retrieves salt for password hash from webshare.cz"""
         url = self._base_url + 'salt/'
         data = {'username_or_email' : user_name}
-        response = requests.post(url, data=data, headers=self._headers)
-        assert(response.status_code == 200)
-        root = ElementTree.fromstring(response.content)
-        assert root.find('status').text == 'OK', 'Return code was not OK, debug info: status: {}, code: {}, message: {}'.format(
-                    root.find('status').text, 
-                    root.find('code').text, 
-                    root.find('message').text)
+        root = _parse_response(self._session.post(url, data=data, headers=self._headers))
+        _check_status(root)
         return root.find('salt').text
 
-    def get_download_link(self, file_id) -> str:
-        """Query actual download link from {file_id}, returning empty string if no link is found"""
+    def get_download_link(self, file_id, verify: bool = True) -> str:
+        """Query actual download link from {file_id}, returning empty string if no link is found
+        Resolved links are cached per account for LINK_TTL. With {verify}, a cached
+        link older than LINK_TRUSTED_FOR is checked with a HEAD request first and
+        resolved again if the file server no longer accepts it.
+        """
+        key = f"webshare:link:{self.account}:{file_id}"
+        if self.cache is not None:
+            entry = self.cache.get(key)
+            if entry is not None and entry.fresh:
+                link = entry.value.decode('utf-8')
+                if not verify or time.time() - entry.stored < self.LINK_TRUSTED_FOR or self.is_link_alive(link):
+                    return link
+            if entry is not None:
+                self.cache.delete(key)
+
+        link = self._resolve_link(file_id)
+        if link and self.cache is not None:
+            self.cache.set(key, link, self.LINK_TTL)
+        return link
+
+    def _resolve_link(self, file_id) -> str:
         url = self._base_url + 'file_link/'
         data = {'ident' : file_id, 'wst' : self._token}
-        response = requests.post(url, data=data, headers=self._headers)
-        root = ElementTree.fromstring(response.content)
+        with perf.span("webshare.file_link"):
+            response = self._session.post(url, data=data, headers=self._headers)
+        root = _parse_response(response)
         return root.find('link').text if root.find('link') is not None else ''
-    
-    def search(self, query: str, limit: int = 30, offset: int = 0, sort: str = 'rating', category: str = 'video'):
-        """Search for videos on webshare.cz
+
+    def is_link_alive(self, link) -> bool:
+        """Checks with a HEAD request whether the file server still serves {link}"""
+        try:
+            with perf.span("webshare.link_check"):
+                response = self._session.head(link, allow_redirects=True, timeout=(3, 5))
+        except Exception:
+            return False
+        return response.status_code < 400
+
+    def iter_search(self, query: str, limit: int = 30, offset: int = 0, sort: str = 'rating', category: str = 'video'):
+        """Streams search results from webshare.cz as WebshareFile records
         query: str - search query
         limit: int - number of results to return
         offset: int - number of results to skip
         sort: str - sort order (recent, rating, largest, smallest)
         category: str - category (video, images, audio, docs, archives)
+        Records are yielded while the response is still being parsed, so the
+        whole XML tree is never held in memory.
         """
         url = self._base_url + 'search/'
         data = {'what' : query.encode('utf-8') ,'sort' : sort, 'limit' : limit, 'offset' : offset, 'category' : category}
-        response = requests.post(url, data=data, headers=self._headers)
-        
-        if response.status_code != 200:
-            raise Exception(f"Search request failed with status code: {response.status_code}")
-            
+        response = self._session.post(url, data=data, headers=self._headers, stream=True)
         try:
-            json_response = xmltodict.parse(response.content)
-            if not json_response or 'response' not in json_response:
-                raise Exception("Invalid response format from server")
-            return json_response
-        except Exception as e:
-            raise Exception(f"Failed to parse search response: {str(e)}")
+            if response.status_code != 200:
+                raise WebshareError(f"Search request failed with status code: {response.status_code}")
+
+            # Let urllib3 undo the gzip transfer encoding while we read
+            response.raw.decode_content = True
+            status = message = None
+            for _, elem in ElementTree.iterparse(response.raw, events=('end',)):
+                if elem.tag == 'file':
+                    yield WebshareFile.from_element(elem)
+                    elem.clear()
+                elif elem.tag == 'status':
+                    status = elem.text
+                elif elem.tag == 'message':
+                    message = elem.text
+            if status != 'OK':
+                raise WebshareError(f"Search failed with status: {status}, message: {message}")
+        except ElementTree.ParseError as e:
+            raise WebshareError(f"Failed to parse search response: {str(e)}")
+        finally:
+            response.close()
+
+    def search_files(self, query: str, limit: int = 30, offset: int = 0, sort: str = 'rating', category: str = 'video'):
+        """Returns one page of search results as a list of WebshareFile records
+        The page is served from the cache when it was fetched (or prefetched) recently.
+        Arguments are the same as iter_search().
+        """
+        key = f"webshare:search:{category}:{sort}:{limit}:{offset}:{query}"
+        if self.cache is not None:
+            cached = self.cache.get_fresh(key)
+            if cached is not None:
+                return [WebshareFile.from_dict(d) for d in json.loads(cached)]
+
+        with perf.span("webshare.search"):
+            files = list(self.iter_search(query, limit, offset, sort, category))
+        if self.cache is not None:
+            self.cache.set_json(key, [f.to_dict() for f in files], self.SEARCH_TTL)
+        return files
+
+    def search_many(self, queries, limit: int = 30, offset: int = 0, sort: str = 'rating', category: str = 'video',
+                    max_workers: int = 4):
+        """Runs several searches concurrently and merges their results
+        Files are deduplicated by ident, keep the order of the first query that
+        returned them and list every query that found them in `queries`.
+        A failing query is skipped unless all of them fail.
+        Returns (files, counts) where counts maps each query to the number of
+        results on its page.
+        """
+        queries = list(dict.fromkeys(queries))
+        if not queries:
+            return [], {}
+
+        def run(query):
+            try:
+                return self.search_files(query, limit, offset, sort, category), None
+            except Exception as e:
+                return [], e
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(queries)))) as executor:
+            pages = list(executor.map(run, queries))
+
+        errors = [error for _, error in pages if error is not None]
+        if len(errors) == len(queries):
+            raise errors[0]
+
+        merged = {}
+        counts = {}
+        for query, (files, error) in zip(queries, pages):
+            if error is not None:
+                print(f"Search for '{query}' failed: {str(error)}")
+            counts[query] = len(files)
+            for file in files:
+                record = merged.setdefault(file.ident, file)
+                record.queries.append(query)
+        return list(merged.values()), counts
+
+    def prefetch_search(self, query: str, limit: int = 30, offset: int = 0, sort: str = 'rating', category: str = 'video'):
+        """Fetches a search page on a background thread so a later search_files() call hits the cache"""
+        def run():
+            try:
+                self.search_files(query, limit, offset, sort, category)
+            except Exception as e:
+                print(f"Prefetch of '{query}' at offset {offset} failed: {str(e)}")
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self._prefetches.append(thread)
+        return thread
+
+    def wait_for_prefetches(self):
+        """Blocks until all background prefetches are done"""
+        while self._prefetches:
+            self._prefetches.pop().join()
         
          
 if __name__ == "__main__":
     # For testing purposes
     webshare = WebshareAPI()
     webshare.login("test", "test")
-    json_search = webshare.search("iron", 5)
-    print(json.dumps(json_search, indent=4))
-    print(webshare.get_download_link(json_search['response']['file'][0]['ident']))
\ No newline at end of file
+    files = list(webshare.iter_search("iron", 5))
+    print(json.dumps([f.to_dict() for f in files], indent=4))
+    print(webshare.get_download_link(files[0].ident))
\ No newline at end of file
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+# Module: service
+# Author: Kecerim24
+# License: GPL v.3 https://www.gnu.org/copyleft/gpl.html
+
+"""
+Background service of the addon.
+
+Runs alongside Kodi and, while Kodi is idle, warms the token and caches the
+plugin reads on the next click (see resources.lib.warmup.Warmer). While an
+episode of a series plays, it prepares the next one and offers to play it
+once the current one ends.
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from urllib.parse import urlencode
+
+import xbmc
+import xbmcaddon
+import xbmcgui
+import xbmcvfs
+
+# Seconds after Kodi starts before the first warm-up
+START_DELAY = 20
+# How often the service checks whether a warm-up is due, in seconds
+CHECK_INTERVAL = 30
+# Seconds without user input before Kodi counts as idle
+IDLE_TIME = 60
+# Share of an episode played before the next one is prepared
+PREPARE_AT = 0.5
+# Seconds the "play next episode" dialog waits for an answer
+OFFER_TIME = 20
+
+
+class PlaybackMonitor(xbmc.Player):
+    """
+    Follows episodes started by the plugin's play route, which stores the
+    episode in a home window property. Halfway through one, the service
+    prepares the next; when it ends, the prepared episode is offered.
+    """
+
+    def __init__(self, service):
+        super().__init__()
+        self.service = service
+        self.playing = None
+        self.prepared = None
+        self.attempted = False
+
+    def onAVStarted(self):
+        from resources.lib.warmup import PLAYING_PROPERTY
+
+        window = xbmcgui.Window(10000)
+        value = window.getProperty(PLAYING_PROPERTY)
+        window.clearProperty(PLAYING_PROPERTY)
+        try:
+            self.playing = json.loads(value) if value else None
+        except ValueError:
+            self.playing = None
+        self.prepared = None
+        self.attempted = False
+
+    def onPlayBackStopped(self):
+        self.playing = self.prepared = None
+
+    def onPlayBackEnded(self):
+        prepared, self.playing, self.prepared = self.prepared, None, None
+        if prepared is not None:
+            self.service.offer_next(prepared)
+
+    def is_due(self) -> bool:
+        """True once the playing episode is far enough along to prepare the next one"""
+        if self.playing is None or self.attempted:
+            return False
+        try:
+            total = self.getTotalTime()
+            return total > 0 and self.getTime() >= total * PREPARE_AT
+        except RuntimeError:
+            return False
+
+
+class WarmupService(xbmc.Monitor):
+    """Runs a warm-up at startup and then periodically while Kodi idles"""
+
+    def __init__(self):
+        super().__init__()
+        self.addon = xbmcaddon.Addon()
+        self.last_run = 0.0
+        self.player = PlaybackMonitor(self)
+
+    def onSettingsChanged(self):
+        self.addon = xbmcaddon.Addon()
+
+    def log(self, message, level=xbmc.LOGINFO):
+        xbmc.log(f"[{self.addon.getAddonInfo('id')}] {message}", level)
+
+    def get_int_setting(self, setting_id, default):
+        try:
+            return int(float(self.addon.getSetting(setting_id)))
+        except ValueError:
+            return default
+
+    def profile_path(self, *parts):
+        profile = xbmcvfs.translatePath(self.addon.getAddonInfo("profile"))
+        if not os.path.isdir(profile):
+            xbmcvfs.mkdirs(profile)
+        return os.path.join(profile, *parts)
+
+    def is_due(self) -> bool:
+        from resources.lib.policy import HOST_RATES, get_policy
+
+        if not self.addon.getSettingBool("service_enabled"):
+            return False
+        # A host that is down would only spend the budget on rejected calls
+        if any(get_policy().is_open(host) for host in HOST_RATES):
+            return False
+        if self.last_run:
+            if time.time() - self.last_run < self.get_int_setting("service_interval", 60) * 60:
+                return False
+            if xbmc.getGlobalIdleTime() < IDLE_TIME:
+                return False
+        # Never compete with playback for bandwidth
+        return not xbmc.Player().isPlaying()
+
+    def run(self):
+        if self.waitForAbort(START_DELAY):
+            return
+        while not self.abortRequested():
+            if self.player.is_due() and self.addon.getSettingBool("next_episode"):
+                self.player.attempted = True
+                try:
+                    self.player.prepared = self.prepare_next(self.player.playing)
+                except Exception as exc:
+                    self.log(f"Preparing the next episode failed: {exc}", xbmc.LOGWARNING)
+            elif self.is_due():
+                self.last_run = time.time()
+                try:
+                    self.warm_up()
+                except Exception as exc:
+                    self.log(f"Warm-up failed: {exc}", xbmc.LOGWARNING)
+            if self.waitForAbort(CHECK_INTERVAL):
+                break
+
+    @contextmanager
+    def warmer(self):
+        """Yields a Warmer on the plugin's caches, logged in with the configured account"""
+        from resources.lib.cache import Cache
+        from resources.lib.csfd import CSFD
+        from resources.lib.history import History
+        from resources.lib.titleindex import TitleIndex
+        from resources.lib.tokenstore import TokenStore, authenticate
+        from resources.lib.warmup import Warmer
+        from resources.lib.webshare import WebshareAPI
+
+        username = self.addon.getSetting("username")
+        password = self.addon.getSetting("password")
+        cache = Cache(self.profile_path("cache.db"), max_bytes=self.get_int_setting("cache_size", 32) * 1024 * 1024)
+        index = TitleIndex(self.profile_path("titles.db"))
+        try:
+            api = WebshareAPI(cache=cache)
+            store = TokenStore(self.profile_path("tokens.json"))
+            warmer = Warmer(
+                api,
+                CSFD(max_workers=self.get_int_setting("csfd_workers", 4), cache=cache, index=index),
+                History(self.profile_path("history.json")),
+                budget=self.get_int_setting("service_budget", 40),
+                login=(lambda force: authenticate(api, store, username, password, force))
+                if username and password else None,
+            )
+            yield warmer
+        finally:
+            cache.close()
+            index.close()
+
+    def warm_up(self):
+        from resources.lib.policy import get_policy
+
+        with self.warmer() as warmer:
+            used = warmer.run(should_stop=self.abortRequested)
+        self.log(f"Warm-up done, {used} requests")
+        for host, counters in get_policy().counters().items():
+            self.log(f"  {host}: " + ", ".join(f"{name}={value}" for name, value in counters.items()))
+
+    def prepare_next(self, playing):
+        with self.warmer() as warmer:
+            prepared = warmer.prepare_next(playing)
+        if prepared is not None:
+            self.log(f"Prepared S{prepared['season']:02d}E{prepared['episode']:02d} of {prepared['title']}")
+        return prepared
+
+    def offer_next(self, prepared):
+        """Asks whether to play the {prepared} episode and starts it through the plugin's play route"""
+        from resources.lib import urlpayload
+        from resources.lib.history import History
+
+        label = f"{prepared['title']} S{prepared['season']:02d}E{prepared['episode']:02d}"
+        if not xbmcgui.Dialog().yesno(
+            self.addon.getAddonInfo("name"),
+            self.addon.getLocalizedString(30033).format(label),
+            autoclose=OFFER_TIME * 1000,
+        ):
+            return
+        episode = {key: prepared[key] for key in ("csfd_id", "title", "original_title", "season", "episode")}
+        url = "plugin://{}/?{}".format(
+            self.addon.getAddonInfo("id"),
+            urlencode({"action": "play", "ident": prepared["ident"], "p": urlpayload.encode(episode)}),
+        )
+        item = xbmcgui.ListItem(label=prepared.get("name") or label, path=url)
+        item.setProperty("IsPlayable", "true")
+        # The link was resolved in advance, the play route finds it in the cache
+        xbmc.Player().play(url, item)
+        History(self.profile_path("history.json")).set_episode(prepared["csfd_id"], prepared["season"], prepared["episode"])
+
+
+if __name__ == "__main__":
+    WarmupService().run()